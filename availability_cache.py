@@ -0,0 +1,122 @@
+"""
+Availability Response Cache
+
+Bounded LRU of /api/availability payloads keyed by (facility_code, date).
+Entries are dropped by the write paths that change a facility/day
+(create_booking, admin_action, sweep_noshows).
+
+With several uvicorn workers each process has its own cache and only sees
+its own invalidations, so entries also expire after ``ttl_seconds``
+(AVAILABILITY_CACHE_TTL); that bounds how long another worker can serve a
+stale day. Invalidations can additionally be fanned out through a shared
+backend attached with ``attach()``. A backend only needs ``publish(key)``
+and ``subscribe(callback)``; ``InMemoryBackend`` is the in-process
+stand-in, and a Redis pub/sub or MongoDB change-stream backend can
+implement the same two methods.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+class InMemoryBackend:
+    """Fans invalidations out to every cache attached in this process"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Key], None]] = []
+
+    def subscribe(self, callback: Callable[[Key], None]) -> None:
+        self._subscribers.append(callback)
+
+    async def publish(self, key: Key) -> None:
+        for callback in self._subscribers:
+            callback(key)
+
+
+class AvailabilityCache:
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 30, backend=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (value, expires_at on the monotonic clock)
+        self._entries: "OrderedDict[Key, Tuple[Any, float]]" = OrderedDict()
+        # Bumped on every invalidation; a result computed across an
+        # invalidation is not stored, so a slow read cannot cache stale data.
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._backend = None
+        if backend is not None:
+            self.attach(backend)
+
+    def attach(self, backend) -> None:
+        """Share invalidations with other workers through ``backend``"""
+        self._backend = backend
+        backend.subscribe(self._drop)
+
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, facility_code: str, date_str: str) -> Optional[Any]:
+        key = (facility_code, date_str)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, facility_code: str, date_str: str, value: Any, epoch: int) -> None:
+        """Store ``value`` unless an invalidation happened since ``epoch`` was read"""
+        if epoch != self._epoch:
+            return
+        key = (facility_code, date_str)
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _drop(self, key: Key) -> None:
+        self._epoch += 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def invalidate(self, facility_code: str, date_str: str) -> None:
+        key = (facility_code, date_str)
+        if self._backend is not None:
+            # the backend delivers to this process too
+            await self._backend.publish(key)
+        else:
+            self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+availability_cache = AvailabilityCache(
+    max_entries=int(os.getenv("AVAILABILITY_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("AVAILABILITY_CACHE_TTL", "30")),
+)
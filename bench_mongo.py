@@ -0,0 +1,331 @@
+"""
+MongoDB benchmarks
+
+End-to-end timings that need a real MongoDB. Point TEST_DATABASE_URL at a
+scratch server; every run seeds and then drops its own database:
+
+    TEST_DATABASE_URL=mongodb://localhost:27017 python bench_mongo.py api
+
+Run without a benchmark name to list them.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+BENCHMARKS: Dict[str, Callable[..., Awaitable[None]]] = {}
+
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__.replace("bench_", "")] = fn
+    return fn
+
+
+# -------------------------------
+# Synthetic data
+# -------------------------------
+
+MEETING_ROOMS = [f"MR-{i + 1}" for i in range(10)]
+
+
+def synthetic(n: int, offset: int = 0, users: int = 5000, first: date = date(2030, 1, 1),
+              codes: Sequence[str] = MEETING_ROOMS) -> List[Dict[str, Any]]:
+    """Bookings shaped like create_booking writes them, spread over ``codes`` and a year"""
+    rows = []
+    for i in range(offset, offset + n):
+        day = first + timedelta(days=i % 365)
+        start_min = (8 + i % 12) * 60
+        start_at = datetime(day.year, day.month, day.day, start_min // 60)
+        status = ["pending", "approved", "rejected"][i % 3]
+        rows.append({
+            "facility_code": codes[i % len(codes)],
+            "date": day.isoformat(),
+            "start_time": f"{start_min // 60:02d}:00",
+            "end_time": f"{start_min // 60 + 1:02d}:00",
+            "start_min": start_min,
+            "end_min": start_min + 60,
+            "start_at": start_at,
+            "status": status,
+            "user_id": f"u{i % users}",
+            "user_name": f"User {i}",
+            "user_email": f"u{i % users}@example.com",
+            "purpose": "Synthetic row, with a comma",
+            "checked_in_at": None,
+            "no_show_deadline": start_at + timedelta(minutes=15) if status == "approved" else None,
+        })
+    return rows
+
+
+async def seed(db, n: int, batch: int = 10000, **options) -> None:
+    for offset in range(0, n, batch):
+        await db["booking"].insert_many(synthetic(min(batch, n - offset), offset, **options), ordered=False)
+
+
+# -------------------------------
+# Harness
+# -------------------------------
+
+@asynccontextmanager
+async def scratch_db():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        raise SystemExit("Set TEST_DATABASE_URL to a scratch MongoDB, e.g. mongodb://localhost:27017")
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(url)
+    db = client[f"bench_{os.getpid()}"]
+    try:
+        yield db
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+@asynccontextmanager
+async def app_client(db):
+    """httpx client for main.app running on ``db``, with indexes and background tasks up"""
+    import httpx
+
+    import database
+    import main
+
+    database._async_db = db
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            yield client
+
+
+async def hammer(call: Callable[[int], Awaitable[Any]], clients: int, requests: int) -> Tuple[List[float], float]:
+    """Run ``requests`` calls from ``clients`` concurrent workers; returns (latencies, wall time)"""
+    latencies: List[float] = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, time.perf_counter() - started
+
+
+def report(name: str, latencies: List[float], elapsed: float) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{name:<28} {len(ms) / elapsed:>8.0f} req/s   p50 {statistics.median(ms):>7.1f} ms   p99 {p99:>7.1f} ms")
+
+
+# -------------------------------
+# Benchmarks
+# -------------------------------
+
+@benchmark
+async def bench_api(clients: int = 500, requests: int = 5000, rows: int = 50000) -> None:
+    """/api/bookings/mine at 500 concurrent clients: sync PyMongo in the threadpool (the original
+    `def` routes) vs the async Motor route"""
+    import httpx
+    from fastapi import FastAPI
+    from pymongo import MongoClient
+
+    async with scratch_db() as db:
+        await seed(db, rows)
+        sync_db = MongoClient(os.environ["TEST_DATABASE_URL"])[db.name]
+        before = FastAPI()
+
+        @before.get("/api/bookings/mine")
+        def my_bookings_sync(user_id: str):
+            found = list(sync_db["booking"].find({"user_id": user_id}).sort("date", 1))
+            for b in found:
+                b["_id"] = str(b["_id"])
+            return found
+
+        users = rows // 10
+        async with app_client(db) as after:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=before), base_url="http://bench") as sync_client:
+                for name, client in (("before (sync, threadpool)", sync_client), ("after (async Motor)", after)):
+                    async def call(i, client=client):
+                        r = await client.get("/api/bookings/mine", params={"user_id": f"u{i % users}"})
+                        r.raise_for_status()
+                    report(name, *await hammer(call, clients, requests))
+        sync_db.client.close()
+
+
+@benchmark
+async def bench_grid(clients: int = 10, requests: int = 500, rows: int = 50000) -> None:
+    """One day view of every facility: /api/availability/grid vs one /api/availability call per
+    facility, availability cache off"""
+    import main as app_main
+    from availability_cache import availability_cache
+
+    codes = [f.code for f in app_main.DEFAULT_FACILITIES]
+    availability_cache.ttl_seconds = 0
+    async with scratch_db() as db:
+        await seed(db, rows, codes=codes)
+        async with app_client(db) as client:
+            (await client.post("/api/facilities/seed")).raise_for_status()
+
+            def day(i):
+                return (date(2030, 1, 1) + timedelta(days=i % 365)).isoformat()
+
+            async def per_facility(i):
+                for code in codes:
+                    r = await client.get("/api/availability", params={"facility_code": code, "date": day(i)})
+                    r.raise_for_status()
+
+            async def grid(i):
+                r = await client.get("/api/availability/grid", params={"date": day(i)})
+                r.raise_for_status()
+
+            report(f"{len(codes)} x /api/availability", *await hammer(per_facility, clients, requests))
+            report("/api/availability/grid", *await hammer(grid, clients, requests))
+
+
+@benchmark
+async def bench_mine(clients: int = 10, requests: int = 200, rows: int = 200000, bookings: int = 10000) -> None:
+    """/api/bookings/mine for one user with 10k bookings: the original unbounded, unindexed
+    query vs keyset pages on the {user_id, date} index"""
+    import httpx
+    from fastapi import FastAPI
+
+    async with scratch_db() as db:
+        await seed(db, rows)
+        heavy = synthetic(bookings, rows)
+        for b in heavy:
+            b["user_id"] = "heavy"
+        await db["booking"].insert_many(heavy)
+        before = FastAPI()
+
+        @before.get("/api/bookings/mine")
+        async def my_bookings_all(user_id: str):
+            found = await db["booking"].find({"user_id": user_id}).sort("date", 1).to_list(length=None)
+            for b in found:
+                b["_id"] = str(b["_id"])
+            return found
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=before), base_url="http://bench") as client:
+            async def unbounded(i):
+                (await client.get("/api/bookings/mine", params={"user_id": "heavy"})).raise_for_status()
+            report("before (all rows, no index)", *await hammer(unbounded, clients, requests))
+
+        # the app's lifespan creates the indexes
+        async with app_client(db) as client:
+            async def first_page(i):
+                (await client.get("/api/bookings/mine", params={"user_id": "heavy", "when": "upcoming"})).raise_for_status()
+
+            async def walk(i):
+                params = {"user_id": "heavy", "limit": 500}
+                while True:
+                    r = await client.get("/api/bookings/mine", params=params)
+                    r.raise_for_status()
+                    params["cursor"] = r.json()["next_cursor"]
+                    if params["cursor"] is None:
+                        break
+
+            report("after (first page)", *await hammer(first_page, clients, requests))
+            report("after (every page, 500 each)", *await hammer(walk, clients, max(1, requests // 10)))
+
+
+@benchmark
+async def bench_sweep(rows: int = 1000000, due: int = 1000) -> None:
+    """No-show sweep over ``rows`` historical bookings with ``due`` expired ones: the original
+    full scan with one update_one per booking vs sweep_noshows"""
+    import database
+    import main as app_main
+    from indexes import ensure_indexes
+
+    async with scratch_db() as db:
+        # history: approved bookings were checked in, so nothing in it is due
+        await seed(db, rows, first=date(2020, 1, 1))
+        await db["booking"].update_many(
+            {"status": "approved"},
+            [{"$set": {"checked_in_at": "$start_at"}}, {"$project": {"no_show_deadline": 0}}],
+        )
+        await ensure_indexes(db)
+        database._async_db = db
+        first = date.today() - timedelta(days=400)
+        expired = [b for b in synthetic(3 * due, rows, first=first) if b["status"] == "approved"]
+
+        async def before():
+            # sweep_noshows as it was: every approved, not checked-in booking, compared in Python
+            changed = 0
+            now = datetime.utcnow()
+            async for b in db["booking"].find({"status": "approved", "checked_in_at": None}):
+                start = datetime.strptime(f"{b['date']} {b['start_time']}", "%Y-%m-%d %H:%M")
+                if now >= start + timedelta(minutes=app_main.NO_SHOW_GRACE_MIN):
+                    await db["booking"].update_one({"_id": b["_id"]}, {"$set": {"status": "no_show"}})
+                    changed += 1
+            return changed
+
+        async def after():
+            return len(await app_main.sweep_noshows())
+
+        for name, sweep in (("before (scan + update_one)", before), ("after (indexed update_many)", after)):
+            await db["booking"].delete_many({"_id": {"$in": [b["_id"] for b in expired if "_id" in b]}})
+            for b in expired:
+                b.pop("_id", None)
+            await db["booking"].insert_many(expired)
+            started = time.perf_counter()
+            changed = await sweep()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<28} {elapsed * 1000:>8.0f} ms   {changed} of {len(expired)} due among {rows} bookings")
+
+
+@benchmark
+async def bench_startup(clients: int = 200, rows: int = 50000, pool: int = 50) -> None:
+    """Cold start with the app's own lazily created client: startup time, the first request and
+    a burst of concurrent requests, without and with pool warm-up (DATABASE_MIN_POOL_SIZE=pool)"""
+    import httpx
+
+    import database
+    import main as app_main
+
+    async with scratch_db() as db:
+        await seed(db, rows)
+        database.database_url, database.database_name = os.environ["TEST_DATABASE_URL"], db.name
+        os.environ["DATABASE_MIN_POOL_SIZE"] = str(pool)
+        users = rows // 10
+        # one start up front so index builds and one-time backfills are not timed
+        async with app_main.lifespan(app_main.app):
+            pass
+        for name, warm in (("no warm-up", False), (f"warm-up ({pool} connections)", True)):
+            app_main.DATABASE_WARMUP = warm
+            database.close_clients()
+            started = time.perf_counter()
+            async with app_main.lifespan(app_main.app):
+                startup = time.perf_counter() - started
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_main.app), base_url="http://bench") as client:
+                    async def call(i):
+                        r = await client.get("/api/bookings/mine", params={"user_id": f"u{i % users}"})
+                        r.raise_for_status()
+                    first, _ = await hammer(call, 1, 1)
+                    print(f"{name:<28} startup {startup * 1000:>7.0f} ms   first request {first[0] * 1000:>7.1f} ms")
+                    report(f"  burst of {clients}", *await hammer(call, clients, clients))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("name", nargs="?", choices=sorted(BENCHMARKS))
+    parser.add_argument("--clients", type=int)
+    parser.add_argument("--requests", type=int)
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--due", type=int)
+    parser.add_argument("--bookings", type=int)
+    parser.add_argument("--pool", type=int)
+    args = parser.parse_args()
+    if args.name is None:
+        for name, fn in sorted(BENCHMARKS.items()):
+            print(f"{name:<10} {' '.join(fn.__doc__.split())}")
+        return
+    options = {k: v for k, v in vars(args).items() if k != "name" and v is not None}
+    asyncio.run(BENCHMARKS[args.name](**options))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Occupancy microbenchmark
+
+Compares day_occupancy() with the per-minute loop /api/availability used
+before the occupancy engine, on days with 1, 20 and 200 bookings:
+
+    python bench_occupancy.py
+"""
+
+import random
+import timeit
+from typing import List, Tuple
+
+from occupancy import day_occupancy
+
+OPEN_MIN, CLOSE_MIN = 8 * 60, 22 * 60
+
+
+def minute_loop(intervals: List[Tuple[int, int]], open_min: int, close_min: int) -> bool:
+    """fully_occupied as the original availability() computed it"""
+    covered = [0] * (close_min - open_min)
+    for start, end in intervals:
+        s = max(start, open_min) - open_min
+        e = min(end, close_min) - open_min
+        for i in range(max(0, s), max(0, e)):
+            if 0 <= i < len(covered):
+                covered[i] = 1
+    return bool(covered) and all(covered)
+
+
+def random_day(n: int, rng: random.Random) -> List[Tuple[int, int]]:
+    day = []
+    for _ in range(n):
+        start = rng.randrange(7 * 60, 22 * 60)
+        day.append((start, min(start + rng.choice([30, 60, 90, 120, 240]), 23 * 60)))
+    return day
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'bookings':>8}  {'minute loop':>12}  {'engine':>10}  {'speedup':>7}")
+    for n in (1, 20, 200):
+        days = [random_day(n, rng) for _ in range(100)]
+        number = max(1, 2000 // n)
+        loop = min(timeit.repeat(lambda: [minute_loop(d, OPEN_MIN, CLOSE_MIN) for d in days], number=number, repeat=5))
+        engine = min(timeit.repeat(lambda: [day_occupancy(d, OPEN_MIN, CLOSE_MIN) for d in days], number=number, repeat=5))
+        per_day = 1e6 / (number * len(days))
+        print(f"{n:>8}  {loop * per_day:>10.1f}us  {engine * per_day:>8.1f}us  {loop / engine:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Slot search microbenchmark
+
+Compares earliest_slots() with the brute force clients used before
+/api/slots/search existed (per facility and day, walk the availability
+minute by minute looking for a long enough free run) on 100k synthetic
+bookings, for a few search windows:
+
+    python bench_slots.py
+"""
+
+import random
+import timeit
+from datetime import date, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from bench_occupancy import CLOSE_MIN, OPEN_MIN, random_day
+from occupancy import Interval, Slot, earliest_slots
+
+FACILITIES = 36
+DAYS = 180
+FIRST = date(2031, 1, 1)
+
+
+def synthetic_intervals(n: int, rng: random.Random) -> Dict[Tuple[str, str], List[Interval]]:
+    """(facility_code, date) -> intervals for ``n`` random bookings"""
+    intervals: Dict[Tuple[str, str], List[Interval]] = {}
+    for _ in range(n):
+        key = (f"F-{rng.randrange(FACILITIES) + 1}", (FIRST + timedelta(days=rng.randrange(DAYS))).isoformat())
+        intervals.setdefault(key, []).append(random_day(1, rng)[0])
+    return intervals
+
+
+def minute_scan(intervals: Dict[Tuple[str, str], List[Interval]], codes: Sequence[str], days: Sequence[str],
+                duration: int, lo: int, hi: int, limit: int) -> List[Slot]:
+    """earliest_slots() done the brute-force way, minute by minute"""
+    slots: List[Slot] = []
+    for d in days:
+        for code in codes:
+            covered = [False] * (hi - lo)
+            for s, e in intervals.get((code, d), []):
+                for m in range(max(s, lo), min(e, hi)):
+                    covered[m - lo] = True
+            run = 0
+            for i, busy in enumerate(covered + [True]):
+                if busy:
+                    if run >= duration:
+                        slots.append((d, lo + i - run, code))
+                    run = 0
+                else:
+                    run += 1
+        if len(slots) >= limit:
+            break
+    slots.sort()
+    return slots[:limit]
+
+
+def main() -> None:
+    rng = random.Random(42)
+    intervals = synthetic_intervals(100_000, rng)
+    codes = [f"F-{i + 1}" for i in range(11)]
+    print(f"{'window':>6}  {'duration':>8}  {'limit':>5}  {'minute scan':>12}  {'engine':>10}  {'speedup':>7}")
+    for window, duration, limit in ((7, 120, 5), (31, 120, 50), (31, 240, 100)):
+        days = [(FIRST + timedelta(days=i)).isoformat() for i in range(window)]
+        args = (intervals, codes, days, duration, OPEN_MIN, CLOSE_MIN, limit)
+        assert minute_scan(*args) == earliest_slots(*args)
+        number = 20
+        scan = min(timeit.repeat(lambda: minute_scan(*args), number=number, repeat=5)) / number
+        engine = min(timeit.repeat(lambda: earliest_slots(*args), number=number, repeat=5)) / number
+        print(f"{window:>5}d  {duration:>6}min  {limit:>5}  {scan * 1000:>10.2f}ms  {engine * 1000:>8.2f}ms  {scan / engine:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+SMTP pool benchmark
+
+Sends 1,000 notifications from 4 worker threads (the outbox's default) to a
+local aiosmtpd server, once opening a connection per message as
+send_email() used to and once through SMTPPool:
+
+    pip install aiosmtpd
+    python bench_smtp.py
+
+A local server has no network latency and no STARTTLS/login, so real
+servers gain more from pooling than this shows.
+"""
+
+import smtplib
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiosmtpd.controller import Controller
+
+from mailer import SMTPPool
+
+MESSAGES = 1000
+WORKERS = 4
+MESSAGE = "Subject: Booking update\r\n\r\nYour booking was approved."
+
+
+class Accept:
+    async def handle_DATA(self, server, session, envelope):
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main() -> None:
+    port = free_port()
+    controller = Controller(Accept(), hostname="127.0.0.1", port=port)
+    controller.start()
+    pool = SMTPPool("127.0.0.1", port, max_size=WORKERS, starttls=False)
+
+    def unpooled(_):
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.sendmail("noreply@example.com", ["user@example.com"], MESSAGE)
+
+    def pooled(_):
+        pool.send("noreply@example.com", ["user@example.com"], MESSAGE)
+
+    try:
+        for name, send in (("connection per message", unpooled), ("SMTPPool", pooled)):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(WORKERS) as executor:
+                list(executor.map(send, range(MESSAGES)))
+            print(f"{name:<24} {MESSAGES / (time.perf_counter() - started):>7.0f} msg/s")
+        print("pool:", pool.stats())
+    finally:
+        pool.close()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Facility Catalog Cache
+
+The facility collection is a few dozen rows that almost never change, so it
+is held in memory keyed by ``code`` and served without touching MongoDB.
+The list endpoint gets pre-serialized JSON bytes and an ETag.
+
+Freshness comes from three sources:
+- a TTL (FACILITY_CACHE_TTL seconds, default 300) checked on access
+- explicit ``invalidate()`` after seeding or editing facilities
+- a MongoDB change stream, when the deployment supports one
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+
+def _json_default(o: Any):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return str(o)
+
+
+class FacilityCatalog:
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        self._body: bytes = b"[]"
+        self._etag: str = ""
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self, db) -> None:
+        """Reload the whole catalog from MongoDB"""
+        rows: List[Dict[str, Any]] = await db["facility"].find({}).to_list(length=None)
+        for r in rows:
+            r["_id"] = str(r["_id"])
+        body = json.dumps(rows, default=_json_default, separators=(",", ":")).encode()
+        self._by_code = {r["code"]: r for r in rows}
+        self._body = body
+        self._etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a reload on next access"""
+        self._loaded_at = None
+
+    async def _ensure_fresh(self, db) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        async with self._lock:
+            # another request may have reloaded while we waited
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_seconds:
+                await self.load(db)
+
+    async def get(self, db, code: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_fresh(db)
+        return self._by_code.get(code)
+
+    async def all(self, db) -> List[Dict[str, Any]]:
+        await self._ensure_fresh(db)
+        return list(self._by_code.values())
+
+    async def serialized(self, db) -> Tuple[bytes, str]:
+        """(JSON body, ETag) for the full catalog"""
+        await self._ensure_fresh(db)
+        return self._body, self._etag
+
+    async def watch(self, db) -> None:
+        """Reload on every facility change; returns if change streams are unsupported"""
+        try:
+            async with db["facility"].watch() as stream:
+                async for _ in stream:
+                    await self.load(db)
+        except PyMongoError as e:
+            # standalone mongod has no change streams; TTL refresh still applies
+            print("[CATALOG] Change stream unavailable:", e)
+        except Exception as e:
+            # never let the background task die silently; TTL refresh still applies
+            print("[CATALOG ERROR] Change stream stopped:", e)
+
+
+catalog = FacilityCatalog(ttl_seconds=float(os.getenv("FACILITY_CACHE_TTL", "300")))
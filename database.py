@@ -6,30 +6,129 @@ Import and use these functions in your API endpoints for database operations.
 """
 
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
-from typing import Union
+from typing import Any, Dict, Iterable, List, Tuple, Union
 from pydantic import BaseModel
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+from bson import ObjectId
 
 # Load environment variables from .env file
 load_dotenv()
 
-_client = None
-db = None
-
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+# Clients are created on first use (or explicitly at app startup), so
+# importing this module never opens connections.
+_client = None
+_db = None
+_async_client = None
+_async_db = None
+_lock = threading.Lock()
+
+# Pool tuning, passed to the driver only when set:
+#   DATABASE_MAX_POOL_SIZE, DATABASE_MIN_POOL_SIZE, DATABASE_MAX_IDLE_TIME_MS,
+#   DATABASE_SERVER_SELECTION_TIMEOUT_MS, DATABASE_COMPRESSORS ("zstd,snappy";
+#   needs the zstandard / python-snappy packages, otherwise the driver skips it)
+_POOL_OPTIONS = {
+    "maxPoolSize": ("DATABASE_MAX_POOL_SIZE", int),
+    "minPoolSize": ("DATABASE_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("DATABASE_MAX_IDLE_TIME_MS", int),
+    "serverSelectionTimeoutMS": ("DATABASE_SERVER_SELECTION_TIMEOUT_MS", int),
+    "compressors": ("DATABASE_COMPRESSORS", str),
+}
+
+def client_options() -> Dict[str, Any]:
+    options = {}
+    for option, (env, cast) in _POOL_OPTIONS.items():
+        value = os.getenv(env)
+        if value:
+            options[option] = cast(value)
+    return options
+
+def get_db():
+    """Sync database handle, or None when DATABASE_URL/DATABASE_NAME are unset"""
+    global _client, _db
+    if _db is None and database_url and database_name:
+        with _lock:
+            if _db is None:
+                _client = MongoClient(database_url, **client_options())
+                _db = _client[database_name]
+    return _db
+
+def get_async_db():
+    """Async database handle for request handlers, or None when not configured"""
+    global _async_client, _async_db
+    if _async_db is None and database_url and database_name:
+        with _lock:
+            if _async_db is None:
+                # Motor, so awaiting Mongo does not pin a threadpool slot
+                _async_client = AsyncIOMotorClient(database_url, **client_options())
+                _async_db = _async_client[database_name]
+    return _async_db
+
+async def warm_up_async(connections: int = None) -> int:
+    """Open ``connections`` pooled connections (default: minPoolSize) before the first request"""
+    async_db = _require_async_db()
+    if connections is None:
+        connections = client_options().get("minPoolSize", 1)
+    # concurrent pings each check out their own connection
+    await asyncio.gather(*(async_db.command("ping") for _ in range(max(connections, 1))))
+    return max(connections, 1)
+
+def close_clients() -> None:
+    """Close both clients; the next get_db()/get_async_db() reconnects"""
+    global _client, _db, _async_client, _async_db
+    with _lock:
+        if _client is not None:
+            _client.close()
+        if _async_client is not None:
+            _async_client.close()
+        _client = _db = _async_client = _async_db = None
+
+def __getattr__(name: str):
+    # keeps ``from database import db, async_db`` working
+    if name == "db":
+        return get_db()
+    if name == "async_db":
+        return get_async_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _require_db():
+    db = get_db()
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    return db
+
+def _require_async_db():
+    async_db = get_async_db()
+    if async_db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    return async_db
 
 # Helper functions for common database operations
+def keyset_filter(sort: List[Tuple[str, int]], last: list) -> dict:
+    """Filter for rows strictly after ``last`` in ``sort`` order (keyset pagination)
+
+    ``last`` holds the sort-key values of the previous page's final row.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: v for (f, _), v in zip(sort[:i], last[:i])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": last[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
 def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    db = _require_db()
 
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
@@ -43,13 +142,305 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     result = db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+def _to_documents(items: Iterable[Union[BaseModel, dict]], now: datetime) -> List[dict]:
+    """Dicts ready for insert_many, all stamped with the same batch timestamp"""
+    docs = [item.model_dump() if isinstance(item, BaseModel) else item.copy() for item in items]
+    for d in docs:
+        d['created_at'] = now
+        d['updated_at'] = now
+    return docs
+
+def _insert_chunk_result(docs: List[dict], offset: int, error: BulkWriteError = None) -> Tuple[List[str], List[Dict[str, Any]], bool]:
+    """(inserted ids, per-item errors, stopped early) for one insert_many chunk"""
+    if error is None:
+        return [str(d['_id']) for d in docs], [], False
+    write_errors = error.details.get('writeErrors', [])
+    failed = {e['index'] for e in write_errors}
+    inserted = error.details.get('nInserted', 0)
+    errors = [{"index": offset + e['index'], "error": e.get('errmsg', 'Write failed')} for e in write_errors]
+    # ordered inserts stop at the first error; unordered ones attempt every document
+    stopped = inserted + len(failed) < len(docs)
+    attempted = docs[:inserted + len(failed)] if stopped else docs
+    ids = [str(d['_id']) for i, d in enumerate(attempted) if i not in failed]
+    return ids, errors, stopped
+
+def create_documents(collection_name: str, items: Iterable[Union[BaseModel, dict]], ordered: bool = False, chunk_size: int = 1000):
+    """Insert many documents with insert_many, ``chunk_size`` per round trip
+
+    Returns {"inserted_ids": [...], "errors": [{"index", "error"}]} where
+    ``index`` is the position in ``items``.
+    """
+    db = _require_db()
+
+    docs = _to_documents(items, datetime.now(timezone.utc))
+    inserted_ids: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    for offset in range(0, len(docs), chunk_size):
+        chunk = docs[offset:offset + chunk_size]
+        try:
+            db[collection_name].insert_many(chunk, ordered=ordered)
+            ids, errs, stopped = _insert_chunk_result(chunk, offset)
+        except BulkWriteError as e:
+            ids, errs, stopped = _insert_chunk_result(chunk, offset, e)
+        inserted_ids.extend(ids)
+        errors.extend(errs)
+        if stopped or (ordered and errs):
+            break
+    return {"inserted_ids": inserted_ids, "errors": errors}
+
+def _find_filter(filter_dict: dict = None, sort: List[Tuple[str, int]] = None, after: list = None) -> dict:
+    query = filter_dict or {}
+    if after is not None:
+        if not sort:
+            raise ValueError("'after' needs a sort to page along")
+        query = {"$and": [query, keyset_filter(sort, after)]} if query else keyset_filter(sort, after)
+    return query
+
+def _cursor_options(cursor, sort=None, skip: int = 0, limit: int = None, batch_size: int = None, max_time_ms: int = None):
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    if max_time_ms:
+        cursor = cursor.max_time_ms(max_time_ms)
+    return cursor
+
+def iter_documents(collection_name: str, filter_dict: dict = None, limit: int = None, *,
+                   projection: dict = None, sort: List[Tuple[str, int]] = None, skip: int = 0,
+                   after: list = None, batch_size: int = None, max_time_ms: int = None):
+    """Iterate documents lazily, one server batch at a time
+
+    ``after`` holds the sort-key values of the last row already seen
+    (keyset pagination) and requires ``sort``.
+    """
+    db = _require_db()
+
+    cursor = db[collection_name].find(_find_filter(filter_dict, sort, after), projection)
+    yield from _cursor_options(cursor, sort, skip, limit, batch_size, max_time_ms)
+
+def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, **options):
+    """Get documents from collection
+
+    Accepts the same keyword options as iter_documents (projection, sort,
+    skip, after, batch_size, max_time_ms).
+    """
+    return list(iter_documents(collection_name, filter_dict, limit, **options))
+
+def find_one_document(collection_name: str, filter_dict: dict = None, projection: dict = None, sort: List[Tuple[str, int]] = None):
+    """Get the first matching document or None"""
+    db = _require_db()
+
+    return db[collection_name].find_one(filter_dict or {}, projection, sort=sort)
+
+
+# Async variants for use inside `async def` endpoints
+async def create_document_async(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp (async)"""
+    async_db = _require_async_db()
+
+    if isinstance(data, BaseModel):
+        data_dict = data.model_dump()
+    else:
+        data_dict = data.copy()
+
+    now = datetime.now(timezone.utc)
+    data_dict['created_at'] = now
+    data_dict['updated_at'] = now
+
+    result = await async_db[collection_name].insert_one(data_dict)
+    return str(result.inserted_id)
+
+async def create_documents_async(collection_name: str, items: Iterable[Union[BaseModel, dict]], ordered: bool = False, chunk_size: int = 1000):
+    """Insert many documents with insert_many (async); see create_documents"""
+    async_db = _require_async_db()
+
+    docs = _to_documents(items, datetime.now(timezone.utc))
+    inserted_ids: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    for offset in range(0, len(docs), chunk_size):
+        chunk = docs[offset:offset + chunk_size]
+        try:
+            await async_db[collection_name].insert_many(chunk, ordered=ordered)
+            ids, errs, stopped = _insert_chunk_result(chunk, offset)
+        except BulkWriteError as e:
+            ids, errs, stopped = _insert_chunk_result(chunk, offset, e)
+        inserted_ids.extend(ids)
+        errors.extend(errs)
+        if stopped or (ordered and errs):
+            break
+    return {"inserted_ids": inserted_ids, "errors": errors}
+
+def _async_cursor(collection_name: str, filter_dict: dict = None, limit: int = None, *,
+                  projection: dict = None, sort: List[Tuple[str, int]] = None, skip: int = 0,
+                  after: list = None, batch_size: int = None, max_time_ms: int = None):
+    async_db = _require_async_db()
+
+    cursor = async_db[collection_name].find(_find_filter(filter_dict, sort, after), projection)
+    return _cursor_options(cursor, sort, skip, limit, batch_size, max_time_ms)
+
+async def iter_documents_async(collection_name: str, filter_dict: dict = None, limit: int = None, **options):
+    """Iterate documents lazily (async); see iter_documents"""
+    async for doc in _async_cursor(collection_name, filter_dict, limit, **options):
+        yield doc
+
+async def get_documents_async(collection_name: str, filter_dict: dict = None, limit: int = None, **options):
+    """Get documents from collection (async); see get_documents"""
+    return await _async_cursor(collection_name, filter_dict, limit, **options).to_list(length=None)
+
+async def find_one_document_async(collection_name: str, filter_dict: dict = None, projection: dict = None, sort: List[Tuple[str, int]] = None):
+    """Get the first matching document or None (async)"""
+    async_db = _require_async_db()
+
+    return await async_db[collection_name].find_one(filter_dict or {}, projection, sort=sort)
+
+
+# Update / delete / upsert helpers
+#
+# ``target`` is a document id (ObjectId or its string form) or a filter dict.
+# ``update`` is either a plain dict of fields to $set, an operator document
+# ({"$set": ..., "$inc": ...}) or an aggregation pipeline (list of stages).
+# ``updated_at`` is maintained on every write. ``write_concern`` takes
+# WriteConcern keyword arguments, e.g. {"w": 1, "j": False}, per call.
+
+def _target_filter(target: Any) -> dict:
+    if isinstance(target, dict):
+        return target
+    if isinstance(target, str) and ObjectId.is_valid(target):
+        return {"_id": ObjectId(target)}
+    return {"_id": target}
+
+def _stamped(update: Union[dict, list], now: datetime) -> Union[dict, list]:
+    if isinstance(update, list):
+        return [*update, {"$set": {"updated_at": now}}]
+    if not any(k.startswith("$") for k in update):
+        update = {"$set": update}
+    update = dict(update)
+    update["$set"] = {**update.get("$set", {}), "updated_at": now}
+    return update
+
+def _collection(database, collection_name: str, write_concern: dict = None):
+    coll = database[collection_name]
+    if write_concern:
+        coll = coll.with_options(write_concern=WriteConcern(**write_concern))
+    return coll
+
+def update_op(target: Any, update: Union[dict, list], upsert: bool = False) -> UpdateOne:
+    """UpdateOne for bulk_write, stamped with updated_at like update_document"""
+    return UpdateOne(_target_filter(target), _stamped(update, datetime.now(timezone.utc)), upsert=upsert)
+
+def _bulk_summary(details: dict) -> Dict[str, Any]:
+    return {
+        "matched": details.get("nMatched", 0),
+        "modified": details.get("nModified", 0),
+        "inserted": details.get("nInserted", 0),
+        "upserted": details.get("nUpserted", 0),
+        "deleted": details.get("nRemoved", 0),
+        "errors": [{"index": e["index"], "error": e.get("errmsg", "Write failed")} for e in details.get("writeErrors", [])],
+    }
+
+def update_document(collection_name: str, target: Any, update: Union[dict, list], upsert: bool = False, write_concern: dict = None):
+    """Update one document; returns the modified count"""
+    db = _require_db()
+
+    result = _collection(db, collection_name, write_concern).update_one(
+        _target_filter(target), _stamped(update, datetime.now(timezone.utc)), upsert=upsert
+    )
+    return result.modified_count
+
+def delete_document(collection_name: str, target: Any, write_concern: dict = None):
+    """Delete one document; returns the deleted count"""
+    db = _require_db()
+
+    return _collection(db, collection_name, write_concern).delete_one(_target_filter(target)).deleted_count
+
+def upsert_document(collection_name: str, filter_dict: dict, data: Union[BaseModel, dict], write_concern: dict = None):
+    """Insert or replace fields of the document matching ``filter_dict``; returns the new id if inserted"""
+    db = _require_db()
+
+    fields = data.model_dump() if isinstance(data, BaseModel) else dict(data)
+    now = datetime.now(timezone.utc)
+    result = _collection(db, collection_name, write_concern).update_one(
+        filter_dict, {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"created_at": now}}, upsert=True
+    )
+    return str(result.upserted_id) if result.upserted_id is not None else None
+
+def find_one_and_update(collection_name: str, target: Any, update: Union[dict, list], projection: dict = None,
+                        return_new: bool = True, upsert: bool = False, sort: List[Tuple[str, int]] = None,
+                        write_concern: dict = None):
+    """Update one document and return it (after the update by default) in one round trip"""
+    db = _require_db()
+
+    return _collection(db, collection_name, write_concern).find_one_and_update(
+        _target_filter(target), _stamped(update, datetime.now(timezone.utc)), projection=projection, sort=sort,
+        upsert=upsert, return_document=ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE,
+    )
+
+def bulk_write(collection_name: str, operations: list, ordered: bool = False, write_concern: dict = None):
+    """Run many write operations in one round trip; returns counts and per-operation errors
+
+    Build updates with update_op() so they carry updated_at.
+    """
+    db = _require_db()
+    if not operations:
+        return _bulk_summary({})
+
+    try:
+        result = _collection(db, collection_name, write_concern).bulk_write(operations, ordered=ordered)
+    except BulkWriteError as e:
+        return _bulk_summary(e.details)
+    return _bulk_summary(result.bulk_api_result)
+
+
+async def update_document_async(collection_name: str, target: Any, update: Union[dict, list], upsert: bool = False, write_concern: dict = None):
+    """Update one document (async); returns the modified count"""
+    async_db = _require_async_db()
+
+    result = await _collection(async_db, collection_name, write_concern).update_one(
+        _target_filter(target), _stamped(update, datetime.now(timezone.utc)), upsert=upsert
+    )
+    return result.modified_count
+
+async def delete_document_async(collection_name: str, target: Any, write_concern: dict = None):
+    """Delete one document (async); returns the deleted count"""
+    async_db = _require_async_db()
+
+    result = await _collection(async_db, collection_name, write_concern).delete_one(_target_filter(target))
+    return result.deleted_count
+
+async def upsert_document_async(collection_name: str, filter_dict: dict, data: Union[BaseModel, dict], write_concern: dict = None):
+    """Insert or replace fields of the matching document (async); returns the new id if inserted"""
+    async_db = _require_async_db()
+
+    fields = data.model_dump() if isinstance(data, BaseModel) else dict(data)
+    now = datetime.now(timezone.utc)
+    result = await _collection(async_db, collection_name, write_concern).update_one(
+        filter_dict, {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"created_at": now}}, upsert=True
+    )
+    return str(result.upserted_id) if result.upserted_id is not None else None
+
+async def find_one_and_update_async(collection_name: str, target: Any, update: Union[dict, list], projection: dict = None,
+                                    return_new: bool = True, upsert: bool = False, sort: List[Tuple[str, int]] = None,
+                                    write_concern: dict = None):
+    """Update one document and return it in one round trip (async)"""
+    async_db = _require_async_db()
+
+    return await _collection(async_db, collection_name, write_concern).find_one_and_update(
+        _target_filter(target), _stamped(update, datetime.now(timezone.utc)), projection=projection, sort=sort,
+        upsert=upsert, return_document=ReturnDocument.AFTER if return_new else ReturnDocument.BEFORE,
+    )
+
+async def bulk_write_async(collection_name: str, operations: list, ordered: bool = False, write_concern: dict = None):
+    """Run many write operations in one round trip (async); see bulk_write"""
+    async_db = _require_async_db()
+    if not operations:
+        return _bulk_summary({})
+
+    try:
+        result = await _collection(async_db, collection_name, write_concern).bulk_write(operations, ordered=ordered)
+    except BulkWriteError as e:
+        return _bulk_summary(e.details)
+    return _bulk_summary(result.bulk_api_result)
@@ -0,0 +1,120 @@
+"""
+Deadline Queue
+
+In-memory min-heap of (deadline, key) pairs with a single asyncio task that
+sleeps until the earliest deadline and hands every key that is due at that
+moment to ``on_expire`` as one batch.
+
+Cancelling is lazy: the heap entry stays and is skipped when it surfaces.
+Rescheduling a key leaves the old entry behind in the same way, while
+scheduling an unchanged deadline is a no-op. When stale entries outnumber
+live ones the heap is rebuilt.
+
+The queue is best-effort; callers should reconcile periodically against the
+database to pick up events this process never saw.
+"""
+
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class DeadlineQueue:
+    def __init__(self, on_expire: Callable[[List[Any]], Awaitable[Any]]):
+        self.on_expire = on_expire
+        self._heap: List[Tuple[datetime, int, Any]] = []
+        self._deadlines: Dict[Any, datetime] = {}
+        self._seq = 0  # tie-breaker so keys themselves never get compared
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.batches = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: Any, deadline: Optional[datetime]) -> None:
+        if deadline is None:
+            # nothing to expire (e.g. a booking without start_at)
+            self.cancel(key)
+            return
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, key))
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._compact()
+        if self._heap[0][2] == key:
+            # new earliest deadline; let the runner re-arm its timer
+            self._wakeup.set()
+
+    def schedule_many(self, items: Iterable[Tuple[Any, datetime]]) -> None:
+        for key, deadline in items:
+            self.schedule(key, deadline)
+
+    def _compact(self) -> None:
+        self._heap = [e for e in self._heap if self._deadlines.get(e[2]) == e[0]]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def cancel(self, key: Any) -> None:
+        self._deadlines.pop(key, None)
+
+    def _pop_due(self, now: datetime) -> List[Any]:
+        due: List[Any] = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                due.append(key)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            # drop cancelled/rescheduled entries sitting at the top
+            while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                # not wait_for: on 3.11 it swallows a cancel that races with set()
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait([waiter], timeout=delay)
+                finally:
+                    waiter.cancel()
+                continue
+            batch = self._pop_due(datetime.utcnow())
+            if not batch:
+                continue
+            self.batches += 1
+            self.fired += len(batch)
+            try:
+                await self.on_expire(batch)
+            except Exception as e:
+                # reconciliation will retry these
+                print("[DEADLINE ERROR]", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "next_deadline": self._heap[0][0] if self._heap else None,
+            "fired": self.fired,
+            "batches": self.batches,
+        }
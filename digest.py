@@ -0,0 +1,65 @@
+"""
+Admin Notification Digest
+
+Buffers new-booking notifications in the "admin_digest" collection and
+flushes them as one summary when ``max_items`` are waiting or the oldest
+has waited ``max_age_seconds``. The buffer lives in MongoDB, so a restart
+does not lose notifications, and any worker can trigger a flush.
+
+A flush claims the waiting items with a token before handing them to
+``on_flush``, so two workers flushing at once never send an item twice.
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+
+from bson import ObjectId
+
+DIGEST_COLLECTION = "admin_digest"
+
+
+class AdminDigest:
+    def __init__(
+        self,
+        on_flush: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        max_items: int = 20,
+        max_age_seconds: float = 300,
+    ):
+        self.on_flush = on_flush
+        self.max_items = max_items
+        self.max_age_seconds = max_age_seconds
+        self.flushes = 0
+
+    async def add(self, db, item: Dict[str, Any]) -> None:
+        await db[DIGEST_COLLECTION].insert_one({**item, "flush_id": None, "queued_at": datetime.utcnow()})
+        if await db[DIGEST_COLLECTION].count_documents({"flush_id": None}) >= self.max_items:
+            try:
+                await self.flush(db)
+            except Exception as e:
+                # the item is stored and flush() put the batch back; the
+                # next flush retries, so the caller's write still succeeds
+                print("[DIGEST ERROR]", e)
+
+    async def flush(self, db) -> int:
+        token = ObjectId()
+        claimed = await db[DIGEST_COLLECTION].update_many({"flush_id": None}, {"$set": {"flush_id": token}})
+        if not claimed.modified_count:
+            return 0
+        items = await db[DIGEST_COLLECTION].find({"flush_id": token}).sort("queued_at", 1).to_list(length=None)
+        try:
+            await self.on_flush(items)
+        except Exception:
+            # put them back for the next flush
+            await db[DIGEST_COLLECTION].update_many({"flush_id": token}, {"$set": {"flush_id": None}})
+            raise
+        await db[DIGEST_COLLECTION].delete_many({"flush_id": token})
+        self.flushes += 1
+        return len(items)
+
+    async def flush_if_due(self, db) -> int:
+        oldest = await db[DIGEST_COLLECTION].find_one({"flush_id": None}, {"queued_at": 1}, sort=[("queued_at", 1)])
+        if oldest is None:
+            return 0
+        if (datetime.utcnow() - oldest["queued_at"]).total_seconds() < self.max_age_seconds:
+            return 0
+        return await self.flush(db)
@@ -0,0 +1,84 @@
+"""
+Index Management
+
+Declares the indexes every query shape in main.py relies on and creates
+them idempotently at startup. Existing indexes that differ from the
+declaration are reported as drift instead of being dropped.
+"""
+
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Collection name -> indexes the API needs on it
+INDEXES: Dict[str, List[IndexModel]] = {
+    "facility": [
+        # find_one({"code": ...}) in availability / create_booking
+        IndexModel([("code", ASCENDING)], name="code_unique", unique=True),
+    ],
+    "booking": [
+        # availability
+        IndexModel([("facility_code", ASCENDING), ("date", ASCENDING), ("status", ASCENDING)], name="facility_date_status"),
+        # my_bookings keyset pagination, either direction
+        IndexModel([("user_id", ASCENDING), ("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="user_id_date_start_id"),
+        IndexModel([("user_email", ASCENDING), ("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="user_email_date_start_id"),
+        # admin_bookings keyset pagination, unfiltered and by status/facility
+        IndexModel([("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="date_start_id"),
+        IndexModel([("status", ASCENDING), ("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="status_date_start_id"),
+        IndexModel([("facility_code", ASCENDING), ("date", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="facility_date_start_id"),
+        # sweep_noshows
+        IndexModel([("status", ASCENDING), ("no_show_deadline", ASCENDING)], name="status_no_show_deadline"),
+    ],
+    "outbox": [
+        # OutboxWorker claims due messages
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        # oldest undelivered message for lag metric
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created"),
+    ],
+    "admin_digest": [
+        # waiting items (flush_id null) oldest first
+        IndexModel([("flush_id", ASCENDING), ("queued_at", ASCENDING)], name="flush_id_queued"),
+    ],
+    "reservation": [
+        # one document per facility/day; enforces atomic slot reservation
+        IndexModel([("facility_code", ASCENDING), ("date", ASCENDING)], name="facility_date_unique", unique=True),
+    ],
+}
+
+
+def _same_spec(current: Dict[str, Any], declared: Dict[str, Any]) -> bool:
+    return (
+        list(current.get("key", [])) == list(declared["key"].items())
+        and bool(current.get("unique")) == bool(declared.get("unique"))
+    )
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create missing indexes and report drift.
+
+    Returns a report with the indexes that were created, declared indexes
+    that exist with a different spec or could not be built (``conflicts``),
+    and indexes present in the database but not declared here (``extra``).
+    """
+    report: Dict[str, List[str]] = {"created": [], "conflicts": [], "extra": []}
+    for collection_name, models in INDEXES.items():
+        coll = db[collection_name]
+        existing = await coll.index_information()
+        for model in models:
+            spec = model.document
+            name = spec["name"]
+            current = existing.get(name)
+            if current is None:
+                try:
+                    await coll.create_indexes([model])
+                    report["created"].append(f"{collection_name}.{name}")
+                except OperationFailure as e:
+                    report["conflicts"].append(f"{collection_name}.{name}: {e}")
+            elif not _same_spec(current, spec):
+                report["conflicts"].append(f"{collection_name}.{name}: spec differs from declaration")
+        declared = {m.document["name"] for m in models}
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report["extra"].append(f"{collection_name}.{name}")
+    return report
@@ -0,0 +1,127 @@
+"""
+SMTP Connection Pool
+
+Keeps up to ``max_size`` authenticated SMTP sessions open and reuses them
+across messages, so a burst of notifications pays for the TCP connect,
+STARTTLS and login once per session instead of once per email.
+
+Sessions idle longer than ``idle_timeout`` are closed instead of reused.
+Sessions idle longer than ``noop_after`` are checked with NOOP first. A send
+that fails because the server dropped the session is retried once on a
+fresh connection.
+
+The pool is thread-safe; the outbox worker sends from a thread pool.
+"""
+
+import smtplib
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class SMTPPool:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        max_size: int = 4,
+        idle_timeout: float = 60,
+        noop_after: float = 10,
+        timeout: float = 30,
+        starttls: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self.timeout = timeout
+        self.starttls = starttls
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.opened = 0
+        self.reused = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self.opened += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                # LIFO keeps the hottest sessions in use and lets the rest time out
+                server, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(server)
+                continue
+            if idle_for > self.noop_after:
+                try:
+                    if server.noop()[0] != 250:
+                        raise smtplib.SMTPException("NOOP failed")
+                except Exception:
+                    server.close()
+                    continue
+            self.reused += 1
+            return server
+        return self._connect()
+
+    def _checkin(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def send(self, from_addr: str, to_addrs: List[str], message: str) -> None:
+        with self._slots:
+            server = self._checkout()
+            try:
+                server.sendmail(from_addr, to_addrs, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # stale session; retry once on a fresh connection
+                server.close()
+                server = self._connect()
+                try:
+                    server.sendmail(from_addr, to_addrs, message)
+                except Exception:
+                    server.close()
+                    raise
+            except Exception:
+                # the session may be mid-transaction; reset before reuse
+                try:
+                    server.rset()
+                    self._checkin(server)
+                except Exception:
+                    server.close()
+                raise
+            self._checkin(server)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+    def stats(self) -> dict:
+        return {"idle": len(self._idle), "max_size": self.max_size, "opened": self.opened, "reused": self.reused}
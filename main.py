@@ -1,18 +1,107 @@
 import os
+import asyncio
+import base64
+import csv
+import io
+import json
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, date
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from database import db, create_document, get_documents
+from pydantic import BaseModel, Field
+
+from database import get_async_db, warm_up_async, close_clients, create_document_async, create_documents_async, find_one_and_update_async, keyset_filter
+from indexes import ensure_indexes
+from occupancy import day_occupancy, earliest_slots, parse_hhmm, to_minutes, to_hhmm, as_hhmm_blocks
+from reservations import LIVE_STATUSES, reserve, release, release_many, backfill_reservations
+from migrations import FACILITY_TZ, backfill_booking_minutes, backfill_noshow_deadlines, booking_time_fields
+from catalog import catalog
+from availability_cache import availability_cache
+from scheduler import Scheduler
+from deadlines import DeadlineQueue
+from outbox import OutboxWorker
+from mailer import SMTPPool
+from digest import AdminDigest
+from templates import (
+    ADMIN_NEW_BOOKING, ADMIN_DIGEST, DIGEST_SECTION, DIGEST_LINE, USER_STATUS,
+    Safe, booking_values, facility_label, user_status_values,
+)
 from schemas import Facility, Booking, AdminAction
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
-import smtplib
 from email.mime.text import MIMEText
 
-app = FastAPI(title="Smart Access - Facilities Management API")
+
+# pre-open the pool at startup; on by default when a minimum pool size is set
+DATABASE_WARMUP = os.getenv("DATABASE_WARMUP", "1" if os.getenv("DATABASE_MIN_POOL_SIZE") else "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # first use creates the client; requests then reuse it
+    async_db = get_async_db()
+    if async_db is not None and DATABASE_WARMUP:
+        try:
+            started = time.perf_counter()
+            opened = await warm_up_async()
+            print(f"[DB] Warmed {opened} connections in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print("[DB ERROR]", e)
+    if async_db is not None:
+        try:
+            report = await ensure_indexes(async_db)
+            if report["created"]:
+                print("[INDEX] Created:", ", ".join(report["created"]))
+            for item in report["conflicts"]:
+                print("[INDEX DRIFT]", item)
+            if report["extra"]:
+                print("[INDEX DRIFT] Undeclared:", ", ".join(report["extra"]))
+        except Exception as e:
+            print("[INDEX ERROR]", e)
+        try:
+            migrated = await backfill_booking_minutes(async_db)
+            if migrated:
+                print(f"[MIGRATION] Backfilled time fields on {migrated} bookings")
+            migrated = await backfill_noshow_deadlines(async_db, NO_SHOW_GRACE_MIN)
+            if migrated:
+                print(f"[MIGRATION] Backfilled no-show deadlines on {migrated} bookings")
+            days = await backfill_reservations(async_db)
+            if days:
+                print(f"[RESERVATION] Backfilled {days} facility/day documents")
+        except Exception as e:
+            print("[RESERVATION ERROR]", e)
+    watcher = None
+    if async_db is not None:
+        try:
+            await catalog.load(async_db)
+            watcher = asyncio.create_task(catalog.watch(async_db))
+        except Exception as e:
+            print("[CATALOG ERROR]", e)
+        try:
+            await load_noshow_deadlines()
+        except Exception as e:
+            print("[DEADLINE ERROR]", e)
+        noshow_queue.start()
+        outbox_worker.start(async_db)
+        if SCHEDULER_ENABLED:
+            await scheduler.start(async_db)
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await noshow_queue.stop()
+    await outbox_worker.stop()
+    if smtp_pool is not None:
+        smtp_pool.close()
+    await scheduler.stop()
+    close_clients()
+
+
+app = FastAPI(title="Smart Access - Facilities Management API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,47 +122,74 @@ def oid_str(o: Any) -> str:
         return o
 
 
-def to_local_dt(date_str: str, time_str: str) -> datetime:
-    # date: YYYY-MM-DD, time HH:MM
-    y, m, d = [int(x) for x in date_str.split("-")]
-    hh, mm = [int(x) for x in time_str.split(":")]
-    return datetime(y, m, d, hh, mm)
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque page cursor from the last row's sort-key values (last one is _id)"""
+    raw = json.dumps([*values[:-1], str(values[-1])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
 
-def overlaps(s1: str, e1: str, s2: str, e2: str) -> bool:
-    a1 = to_local_dt("2000-01-01", s1)
-    b1 = to_local_dt("2000-01-01", e1)
-    a2 = to_local_dt("2000-01-01", s2)
-    b2 = to_local_dt("2000-01-01", e2)
-    return a1 < b2 and a2 < b1
+def decode_cursor(cursor: str, sort: List[tuple]) -> List[Any]:
+    """Sort-key values from encode_cursor(), checked against ``sort``"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(sort):
+            raise ValueError("cursor does not match the sort")
+        if not all(isinstance(v, (str, int, float)) for v in values):
+            raise ValueError("cursor values must be scalars")
+        values[-1] = ObjectId(values[-1])
+        return values
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], required: List[str]) -> Optional[Dict[str, int]]:
+    """Projection from a comma-separated ``fields`` param, always keeping ``required``"""
+    if not fields:
+        return None
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    if any(f.startswith("$") for f in wanted):
+        raise HTTPException(status_code=400, detail="Invalid field name")
+    wanted |= set(required)
+    return {f: 1 for f in wanted}
+
+
+smtp_host = os.getenv("SMTP_HOST")
+smtp_port = int(os.getenv("SMTP_PORT", "0") or 0)
+smtp_user = os.getenv("SMTP_USER")
+smtp_pass = os.getenv("SMTP_PASS")
+from_email = os.getenv("FROM_EMAIL", smtp_user or "noreply@example.com")
+
+smtp_pool: Optional[SMTPPool] = None
+if smtp_host and smtp_port:
+    smtp_pool = SMTPPool(
+        smtp_host, smtp_port, smtp_user, smtp_pass,
+        max_size=int(os.getenv("SMTP_POOL_SIZE", "4")),
+        idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT", "60")),
+        starttls=os.getenv("SMTP_STARTTLS", "1") == "1",
+    )
 
 
 def send_email(to_email: str, subject: str, body: str):
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "0") or 0)
-    smtp_user = os.getenv("SMTP_USER")
-    smtp_pass = os.getenv("SMTP_PASS")
-    from_email = os.getenv("FROM_EMAIL", smtp_user or "noreply@example.com")
-
-    if not smtp_host or not smtp_port:
+    """Deliver one message; raises on failure so the outbox can retry"""
+    if smtp_pool is None:
         print("[EMAIL LOG] To:", to_email)
         print("Subject:", subject)
         print(body)
         return
 
-    try:
-        msg = MIMEText(body, "html")
-        msg["Subject"] = subject
-        msg["From"] = from_email
-        msg["To"] = to_email
-
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            if smtp_user and smtp_pass:
-                server.login(smtp_user, smtp_pass)
-            server.sendmail(from_email, [to_email], msg.as_string())
-    except Exception as e:
-        print("[EMAIL ERROR]", e)
+    msg = MIMEText(body, "html")
+    msg["Subject"] = subject
+    msg["From"] = from_email
+    msg["To"] = to_email
+
+    smtp_pool.send(from_email, [to_email], msg.as_string())
+
+
+outbox_worker = OutboxWorker(
+    send_email,
+    concurrency=int(os.getenv("OUTBOX_CONCURRENCY", "4")),
+    max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6")),
+)
 
 
 # -------------------------------
@@ -111,17 +227,19 @@ DEFAULT_FACILITIES: List[Facility] = build_default_facilities()
 
 
 @app.post("/api/facilities/seed")
-def seed_facilities():
-    if db is None:
+async def seed_facilities():
+    async_db = get_async_db()
+    if async_db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
-    count = db["facility"].count_documents({})
+    count = await async_db["facility"].count_documents({})
     if count > 0:
         return {"message": "Facilities already seeded", "count": count}
-    inserted = 0
-    for fac in DEFAULT_FACILITIES:
-        create_document("facility", fac)
-        inserted += 1
-    return {"message": "Facilities seeded", "count": inserted}
+    result = await create_documents_async("facility", DEFAULT_FACILITIES)
+    catalog.invalidate()
+    response = {"message": "Facilities seeded", "count": len(result["inserted_ids"])}
+    if result["errors"]:
+        response["errors"] = result["errors"]
+    return response
 
 
 # -------------------------------
@@ -134,60 +252,176 @@ def root():
 
 
 @app.get("/api/facilities")
-def list_facilities() -> List[Dict[str, Any]]:
-    facilities = get_documents("facility")
-    out = []
-    for f in facilities:
-        f["_id"] = oid_str(f.get("_id"))
-        out.append(f)
-    return out
+async def list_facilities(request: Request):
+    body, etag = await catalog.serialized(get_async_db())
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# consider full day 08:00-22:00 for all facilities as operation hours
+OPEN_TIME, CLOSE_TIME = "08:00", "22:00"
+OPEN_MIN, CLOSE_MIN = to_minutes(OPEN_TIME), to_minutes(CLOSE_TIME)
+AVAILABILITY_FIELDS = {"_id": 0, "start_time": 1, "end_time": 1, "start_min": 1, "end_min": 1, "status": 1}
+
+
+def summarize_day(facility_code: str, date_str: str, bookings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Availability payload for one facility/day from its pending/approved bookings"""
+    intervals = [{
+        "start": b["start_time"],
+        "end": b["end_time"],
+        "status": b["status"]
+    } for b in bookings]
+    occ = day_occupancy(((b["start_min"], b["end_min"]) for b in bookings), OPEN_MIN, CLOSE_MIN)
+    return {
+        "facility_code": facility_code,
+        "date": date_str,
+        "unavailable": intervals,
+        "busy": as_hhmm_blocks(occ["busy"]),
+        "free": as_hhmm_blocks(occ["free"]),
+        "fully_occupied": occ["fully_occupied"],
+        "hours": {"open": OPEN_TIME, "close": CLOSE_TIME}
+    }
 
 
 @app.get("/api/availability")
-def availability(facility_code: str = Query(...), date_str: str = Query(..., alias="date")):
+async def availability(facility_code: str = Query(...), date_str: str = Query(..., alias="date")):
     # find facility
-    fac = db["facility"].find_one({"code": facility_code})
+    fac = await catalog.get(get_async_db(), facility_code)
     if not fac:
         raise HTTPException(status_code=404, detail="Facility not found")
+    cached = availability_cache.get(facility_code, date_str)
+    if cached is not None:
+        return cached
+    epoch = availability_cache.epoch()
     # get bookings for that date which are not cancelled/rejected
-    bookings = list(db["booking"].find({
+    bookings = await get_async_db()["booking"].find({
         "facility_code": facility_code,
         "date": date_str,
         "status": {"$in": ["pending", "approved"]}
-    }))
-    intervals = [{
-        "start": b["start_time"],
-        "end": b["end_time"],
-        "status": b["status"]
-    } for b in bookings]
+    }, AVAILABILITY_FIELDS).to_list(length=None)
+    result = summarize_day(facility_code, date_str, bookings)
+    availability_cache.set(facility_code, date_str, result, epoch)
+    return result
+
+
+@app.get("/api/availability/grid")
+async def availability_grid(date_str: str = Query(..., alias="date"), facility_type: Optional[str] = Query(None, alias="type")):
+    facilities = [f for f in await catalog.all(get_async_db()) if facility_type is None or f.get("type") == facility_type]
+    codes = [f["code"] for f in facilities]
+    # one aggregation for the whole day view instead of one call per facility
+    grouped = await get_async_db()["booking"].aggregate([
+        {"$match": {
+            "facility_code": {"$in": codes},
+            "date": date_str,
+            "status": {"$in": ["pending", "approved"]}
+        }},
+        {"$project": {"facility_code": 1, **AVAILABILITY_FIELDS}},
+        {"$group": {"_id": "$facility_code", "bookings": {"$push": "$$ROOT"}}},
+    ]).to_list(length=None)
+    by_code = {g["_id"]: g["bookings"] for g in grouped}
+    return {
+        "date": date_str,
+        "facilities": [summarize_day(code, date_str, by_code.get(code, [])) for code in codes],
+    }
+
 
-    fully_occupied = False
-    # consider full day 08:00-22:00 for all facilities as operation hours
-    open_t, close_t = "08:00", "22:00"
-    # naive full-day detection: if one booking covers full range OR sum covers all 14 hours with no gaps.
-    def minutes(t: str) -> int:
-        h, m = [int(x) for x in t.split(":")]
-        return h*60 + m
-
-    covered = [0] * (minutes(close_t) - minutes(open_t))
-    for b in bookings:
-        s = max(minutes(b["start_time"]), minutes(open_t)) - minutes(open_t)
-        e = min(minutes(b["end_time"]), minutes(close_t)) - minutes(open_t)
-        for i in range(max(0, s), max(0, e)):
-            if 0 <= i < len(covered):
-                covered[i] = 1
-    if covered and all(covered):
-        fully_occupied = True
+MAX_RANGE_DAYS = 31
 
+
+async def fetch_day_intervals(codes: List[str], first_day: str, last_day: str) -> Dict[tuple, List[tuple]]:
+    """(facility_code, date) -> [(start_min, end_min)] of live bookings in a window"""
+    # Single range query, sorted along the (facility_code, date) index so the
+    # rows can be grouped per facility/day as they stream in.
+    cursor = get_async_db()["booking"].find({
+        "facility_code": {"$in": codes},
+        "date": {"$gte": first_day, "$lte": last_day},
+        "status": {"$in": ["pending", "approved"]}
+    }, {"_id": 0, "facility_code": 1, "date": 1, "start_min": 1, "end_min": 1}).sort([("facility_code", 1), ("date", 1)])
+    intervals: Dict[tuple, List[tuple]] = {}
+    async for b in cursor:
+        intervals.setdefault((b["facility_code"], b["date"]), []).append((b["start_min"], b["end_min"]))
+    return intervals
+
+
+def parse_date_window(date_from: str, date_to: str) -> List[str]:
+    try:
+        start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def occupancy_summary(date_str: str, intervals: List[tuple]) -> Dict[str, Any]:
+    occ = day_occupancy(intervals, OPEN_MIN, CLOSE_MIN)
     return {
-        "facility_code": facility_code,
         "date": date_str,
-        "unavailable": intervals,
-        "fully_occupied": fully_occupied,
-        "hours": {"open": open_t, "close": close_t}
+        "busy": as_hhmm_blocks(occ["busy"]),
+        "free": as_hhmm_blocks(occ["free"]),
+        "fully_occupied": occ["fully_occupied"],
     }
 
 
+@app.get("/api/availability/range")
+async def availability_range(
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    facility_codes: Optional[List[str]] = Query(None, alias="facility_code"),
+):
+    days = parse_date_window(date_from, date_to)
+    if facility_codes:
+        for code in facility_codes:
+            if not await catalog.get(get_async_db(), code):
+                raise HTTPException(status_code=404, detail=f"Facility not found: {code}")
+    codes = facility_codes or [f["code"] for f in await catalog.all(get_async_db())]
+
+    intervals = await fetch_day_intervals(codes, days[0], days[-1])
+
+    return {
+        "from": days[0],
+        "to": days[-1],
+        "hours": {"open": OPEN_TIME, "close": CLOSE_TIME},
+        "facilities": [{
+            "facility_code": code,
+            "days": [occupancy_summary(d, intervals.get((code, d), [])) for d in days],
+        } for code in codes],
+    }
+
+
+@app.get("/api/slots/search")
+async def search_slots(
+    facility_type: str = Query(..., alias="type"),
+    duration: int = Query(..., gt=0, description="Minutes"),
+    date_from: str = Query(..., alias="from"),
+    date_to: str = Query(..., alias="to"),
+    earliest: Optional[str] = Query(None, description="HH:MM, earliest start"),
+    latest: Optional[str] = Query(None, description="HH:MM, latest end"),
+    limit: int = Query(5, ge=1, le=100),
+):
+    days = parse_date_window(date_from, date_to)
+    codes = [f["code"] for f in await catalog.all(get_async_db()) if f.get("type") == facility_type]
+    try:
+        lo = max(OPEN_MIN, parse_hhmm(earliest)) if earliest else OPEN_MIN
+        hi = min(CLOSE_MIN, parse_hhmm(latest)) if latest else CLOSE_MIN
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    intervals = await fetch_day_intervals(codes, days[0], days[-1])
+
+    # slots are facility-local wall-clock times
+    now = datetime.now(FACILITY_TZ)
+    found = earliest_slots(intervals, codes, days, duration, lo, hi, limit,
+                           not_before=(now.date().isoformat(), now.hour * 60 + now.minute))
+    return {"slots": [
+        {"facility_code": code, "date": d, "start": to_hhmm(s), "end": to_hhmm(s + duration)}
+        for d, s, code in found
+    ]}
+
+
 # -------------------------------
 # Booking
 # -------------------------------
@@ -203,51 +437,87 @@ class CreateBooking(BaseModel):
     end_time: str  # HH:MM
 
 
-def notify_admin_new_booking(data: Dict[str, Any]):
+# "immediate" sends one email per request; "digest" batches them, except
+# for facility types listed in ADMIN_URGENT_TYPES which are always immediate
+ADMIN_NOTIFY_MODE = os.getenv("ADMIN_NOTIFY_MODE", "immediate")
+ADMIN_URGENT_TYPES = {t.strip() for t in os.getenv("ADMIN_URGENT_TYPES", "").split(",") if t.strip()}
+
+
+async def notify_admin_new_booking(data: Dict[str, Any], facility_type: Optional[str] = None):
+    if ADMIN_NOTIFY_MODE == "digest" and facility_type not in ADMIN_URGENT_TYPES:
+        await admin_digest.add(get_async_db(), data)
+        return
     admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
     subject = f"New booking request: {data['facility_code']} on {data['date']}"
-    body = f"""
-    <h3>New Booking Request</h3>
-    <p><b>Facility:</b> {data['facility_code']}</p>
-    <p><b>Date:</b> {data['date']} {data['start_time']}-{data['end_time']}</p>
-    <p><b>User:</b> {data['user_name']} (ID: {data.get('user_id','-')})</p>
-    <p><b>Purpose:</b> {data.get('purpose','-')}</p>
-    <p>Please review in the admin panel.</p>
-    """
-    send_email(admin_email, subject, body)
+    body = ADMIN_NEW_BOOKING.render(**booking_values(data))
+    await outbox_worker.enqueue(get_async_db(), admin_email, subject, body)
 
 
-def notify_user_status(email: Optional[str], status: str, facility_code: str, date_str: str, start: str, end: str, access_code: Optional[str]):
+async def send_admin_digest(items: List[Dict[str, Any]]):
+    admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for d in items:
+        groups.setdefault((d["facility_code"], d["date"]), []).append(d)
+    sections = []
+    for (code, date_str), rows in sorted(groups.items()):
+        rows.sort(key=lambda r: r["start_time"])
+        lines = Safe("".join(DIGEST_LINE.render_many(booking_values(d) for d in rows)))
+        sections.append(DIGEST_SECTION.render(facility=facility_label(code), date=date_str, lines=lines))
+    subject = f"{len(items)} new booking requests"
+    body = ADMIN_DIGEST.render(sections=Safe("".join(sections)))
+    await outbox_worker.enqueue(get_async_db(), admin_email, subject, body)
+
+
+admin_digest = AdminDigest(
+    send_admin_digest,
+    max_items=int(os.getenv("ADMIN_DIGEST_MAX_BOOKINGS", "20")),
+    max_age_seconds=float(os.getenv("ADMIN_DIGEST_MAX_SECONDS", "300")),
+)
+
+
+async def notify_user_status(email: Optional[str], status: str, facility_code: str, date_str: str, start: str, end: str, access_code: Optional[str]):
     if not email:
         return  # no email available; skip
     subject = f"Your booking has been {status}"
-    code_html = f"<p><b>Access code:</b> {access_code}</p>" if access_code else ""
-    body = f"""
-    <p>Your booking request for <b>{facility_code}</b> on <b>{date_str} {start}-{end}</b> has been <b>{status}</b>.</p>
-    {code_html}
-    """
-    send_email(email, subject, body)
+    body = USER_STATUS.render(**user_status_values(status, facility_code, date_str, start, end, access_code))
+    await outbox_worker.enqueue(get_async_db(), email, subject, body)
+
+
+async def notify_user_status_many(rows: List[Dict[str, Any]]):
+    """Queue status emails for many bookings with one render pass and one insert"""
+    rows = [r for r in rows if r.get("user_email")]
+    bodies = USER_STATUS.render_many(
+        user_status_values(r["status"], r["facility_code"], r["date"], r["start_time"], r["end_time"], r.get("access_code"))
+        for r in rows
+    )
+    await outbox_worker.enqueue_many(get_async_db(), [
+        {"to": r["user_email"], "subject": f"Your booking has been {r['status']}", "body": body}
+        for r, body in zip(rows, bodies)
+    ])
 
 
 @app.post("/api/bookings")
-def create_booking(payload: CreateBooking, background_tasks: BackgroundTasks):
-    fac = db["facility"].find_one({"code": payload.facility_code})
+async def create_booking(payload: CreateBooking):
+    fac = await catalog.get(get_async_db(), payload.facility_code)
     if not fac:
         raise HTTPException(status_code=404, detail="Facility not found")
 
     # Time validation
-    if payload.start_time >= payload.end_time:
+    try:
+        times = booking_time_fields(payload.date, payload.start_time, payload.end_time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if times["start_min"] >= times["end_min"]:
         raise HTTPException(status_code=400, detail="Invalid time range")
 
-    # Check overlaps (pending or approved only)
-    existing = list(db["booking"].find({
-        "facility_code": payload.facility_code,
-        "date": payload.date,
-        "status": {"$in": ["pending", "approved"]}
-    }))
-    for b in existing:
-        if overlaps(payload.start_time, payload.end_time, b["start_time"], b["end_time"]):
-            raise HTTPException(status_code=409, detail="Time slot not available")
+    # Claim the slot atomically against other pending/approved bookings.
+    # The conditional update compares integer minutes, so no string parsing
+    # or fetching of the day's bookings is needed.
+    _id = ObjectId()
+    reserved = await reserve(get_async_db(), payload.facility_code, payload.date, _id,
+                             times["start_min"], times["end_min"])
+    if not reserved:
+        raise HTTPException(status_code=409, detail="Time slot not available")
 
     booking = Booking(
         facility_id=str(fac.get("_id")),
@@ -259,20 +529,40 @@ def create_booking(payload: CreateBooking, background_tasks: BackgroundTasks):
         start_time=payload.start_time,
         end_time=payload.end_time,
         status="pending",
+        **times,
         # extra dynamic fields supported by create_document
     )
     # add user_id into dict (even if model doesn't define field strictly, create_document stores dict)
     data = booking.model_dump()
     data["user_id"] = payload.user_id
-    booking_id = create_document("booking", data)
+    data["_id"] = _id
+    try:
+        booking_id = await create_document_async("booking", data)
+    except Exception:
+        await release(get_async_db(), payload.facility_code, payload.date, _id)
+        raise
+    await availability_cache.invalidate(payload.facility_code, payload.date)
 
-    background_tasks.add_task(notify_admin_new_booking, {**payload.model_dump(), "_id": booking_id})
+    await notify_admin_new_booking({**payload.model_dump(), "_id": booking_id}, fac.get("type"))
 
     return {"message": "Booking created and pending approval", "booking_id": booking_id}
 
 
+# what the "my bookings" screen shows
+MY_BOOKING_FIELDS = {
+    "facility_code": 1, "date": 1, "start_time": 1, "end_time": 1,
+    "status": 1, "purpose": 1, "access_code": 1, "checked_in_at": 1,
+}
+
+
 @app.get("/api/bookings/mine")
-def my_bookings(email: Optional[str] = Query(None), user_id: Optional[str] = Query(None)):
+async def my_bookings(
+    email: Optional[str] = Query(None),
+    user_id: Optional[str] = Query(None),
+    when: Optional[Literal["upcoming", "past"]] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+):
     if not email and not user_id:
         raise HTTPException(status_code=400, detail="Provide user_id or email")
     query: Dict[str, Any] = {}
@@ -280,42 +570,286 @@ def my_bookings(email: Optional[str] = Query(None), user_id: Optional[str] = Que
         query["user_id"] = user_id
     else:
         query["user_email"] = email
-    rows = list(db["booking"].find(query).sort("date", 1))
+    # upcoming reads forward from today, past reads backwards (most recent first)
+    direction = -1 if when == "past" else 1
+    sort = [("date", direction), ("start_time", direction), ("_id", direction)]
+    # booking dates are facility-local
+    today = datetime.now(FACILITY_TZ).date().isoformat()
+    if when == "upcoming":
+        query["date"] = {"$gte": today}
+    elif when == "past":
+        query["date"] = {"$lt": today}
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+
+    rows = await get_async_db()["booking"].find(query, MY_BOOKING_FIELDS).sort(sort).limit(limit + 1).to_list(length=None)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][k] for k, _ in sort])
     for r in rows:
         r["_id"] = oid_str(r["_id"])
-    return rows
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+ADMIN_BOOKINGS_SORT = [("date", 1), ("start_time", 1), ("_id", 1)]
+
+
+def admin_booking_filter(status: Optional[str], facility_code: Optional[str],
+                         date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if facility_code:
+        query["facility_code"] = facility_code
+    if date_from or date_to:
+        query["date"] = {}
+        if date_from:
+            query["date"]["$gte"] = date_from
+        if date_to:
+            query["date"]["$lte"] = date_to
+    return query
 
 
 @app.get("/api/admin/bookings")
-def admin_bookings():
-    rows = list(db["booking"].find({}).sort([("date", 1), ("start_time", 1)]))
+async def admin_bookings(
+    status: Optional[str] = Query(None),
+    facility_code: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+):
+    query = admin_booking_filter(status, facility_code, date_from, date_to)
+    if cursor:
+        query = {"$and": [query, keyset_filter(ADMIN_BOOKINGS_SORT, decode_cursor(cursor, ADMIN_BOOKINGS_SORT))]}
+    projection = parse_fields(fields, [k for k, _ in ADMIN_BOOKINGS_SORT])
+
+    # fetch one extra row to know whether there is a next page
+    rows = await get_async_db()["booking"].find(query, projection).sort(ADMIN_BOOKINGS_SORT).limit(limit + 1).to_list(length=None)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[k] for k, _ in ADMIN_BOOKINGS_SORT])
     for r in rows:
         r["_id"] = oid_str(r["_id"])
-    return rows
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+EXPORT_FIELDS = [
+    "_id", "facility_code", "date", "start_time", "end_time", "status",
+    "user_id", "user_name", "user_email", "purpose", "access_code", "checked_in_at", "created_at",
+]
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_value(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, ObjectId):
+        return str(v)
+    return v
+
+
+@app.get("/api/admin/bookings/export")
+async def export_bookings(
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    status: Optional[str] = Query(None),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+):
+    query = admin_booking_filter(status, None, date_from, date_to)
+    cursor = get_async_db()["booking"].find(query, {f: 1 for f in EXPORT_FIELDS}) \
+        .sort(ADMIN_BOOKINGS_SORT).batch_size(EXPORT_BATCH_SIZE)
+
+    # Rows are encoded as they arrive from the cursor and yielded one batch
+    # at a time, so memory stays flat regardless of how many rows match.
+    async def csv_rows():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_FIELDS)
+        n = 0
+        async for b in cursor:
+            writer.writerow([export_value(b.get(f)) for f in EXPORT_FIELDS])
+            n += 1
+            if n % EXPORT_BATCH_SIZE == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    async def ndjson_rows():
+        lines: List[str] = []
+        async for b in cursor:
+            lines.append(json.dumps({f: export_value(b.get(f)) for f in EXPORT_FIELDS}))
+            if len(lines) == EXPORT_BATCH_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    if fmt == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="bookings.csv"'})
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="bookings.ndjson"'})
+
+
+ADMIN_ACTION_FIELDS = {
+    "facility_code": 1, "date": 1, "start_time": 1, "end_time": 1, "user_email": 1, "no_show_deadline": 1,
+}
+
+
+async def reapprove(_id: ObjectId, approve: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Approve a rejected/no-show booking, re-claiming the slot it released"""
+    prev = await get_async_db()["booking"].find_one(
+        {"_id": _id}, {"status": 1, "facility_code": 1, "date": 1, "start_min": 1, "end_min": 1})
+    if not prev:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not await reserve(get_async_db(), prev["facility_code"], prev["date"], _id, prev["start_min"], prev["end_min"]):
+        raise HTTPException(status_code=409, detail="Time slot not available")
+    # only if nobody changed the booking since it was read
+    b = await find_one_and_update_async("booking", {"_id": _id, "status": prev["status"]}, approve,
+                                        projection=ADMIN_ACTION_FIELDS)
+    if not b:
+        await release(get_async_db(), prev["facility_code"], prev["date"], _id)
+        raise HTTPException(status_code=409, detail="Booking changed concurrently, retry")
+    return b
 
 
 @app.post("/api/bookings/{booking_id}/admin")
-def admin_action(booking_id: str, action: AdminAction):
+async def admin_action(booking_id: str, action: AdminAction):
     try:
         _id = ObjectId(booking_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid booking id")
 
-    b = db["booking"].find_one({"_id": _id})
-    if not b:
-        raise HTTPException(status_code=404, detail="Not found")
-
+    # one round trip: update and read back the fields needed for side effects
     if action.action == "approve":
         access_code = os.urandom(3).hex().upper()
-        db["booking"].update_one({"_id": _id}, {"$set": {"status": "approved", "access_code": access_code}})
-        notify_user_status(b.get("user_email"), "approved", b["facility_code"], b["date"], b["start_time"], b["end_time"], access_code)
+        approve = [{"$set": {
+            "status": "approved",
+            "access_code": {"$literal": access_code},
+            # start_at is backfilled at startup, so the deadline is computed server-side
+            "no_show_deadline": {"$add": ["$start_at", NO_SHOW_GRACE_MIN * 60 * 1000]},
+        }}]
+        # live bookings still hold their slot
+        b = await find_one_and_update_async("booking", {"_id": _id, "status": {"$in": LIVE_STATUSES}}, approve,
+                                            projection=ADMIN_ACTION_FIELDS)
+        if not b:
+            b = await reapprove(_id, approve)
+        noshow_queue.schedule(_id, b["no_show_deadline"])
+        await availability_cache.invalidate(b["facility_code"], b["date"])
+        await notify_user_status(b.get("user_email"), "approved", b["facility_code"], b["date"], b["start_time"], b["end_time"], access_code)
         return {"message": "Approved"}
     else:
-        db["booking"].update_one({"_id": _id}, {"$set": {"status": "rejected"}})
-        notify_user_status(b.get("user_email"), "rejected", b["facility_code"], b["date"], b["start_time"], b["end_time"], None)
+        b = await find_one_and_update_async("booking", _id, {"status": "rejected"}, projection=ADMIN_ACTION_FIELDS)
+        if not b:
+            raise HTTPException(status_code=404, detail="Not found")
+        noshow_queue.cancel(_id)
+        await release(get_async_db(), b["facility_code"], b["date"], _id)
+        await availability_cache.invalidate(b["facility_code"], b["date"])
+        await notify_user_status(b.get("user_email"), "rejected", b["facility_code"], b["date"], b["start_time"], b["end_time"], None)
         return {"message": "Rejected"}
 
 
+class BulkAdminItem(BaseModel):
+    booking_id: str
+    action: Literal["approve", "reject"]
+
+
+class BulkAdminAction(BaseModel):
+    items: List[BulkAdminItem] = Field(..., max_length=1000)
+
+
+@app.post("/api/admin/bookings/bulk")
+async def admin_bulk_action(payload: BulkAdminAction):
+    results: List[Dict[str, Any]] = [
+        {"booking_id": item.booking_id, "action": item.action, "ok": False} for item in payload.items
+    ]
+    wanted: Dict[ObjectId, int] = {}
+    for i, item in enumerate(payload.items):
+        try:
+            _id = ObjectId(item.booking_id)
+        except Exception:
+            results[i]["error"] = "Invalid booking id"
+            continue
+        if _id in wanted:
+            results[i]["error"] = "Duplicate booking id"
+            continue
+        wanted[_id] = i
+
+    found = {b["_id"]: b async for b in get_async_db()["booking"].find({"_id": {"$in": list(wanted)}})}
+    # one urandom call for every access code in the batch
+    entropy = os.urandom(3 * len(wanted)).hex().upper()
+    ops: List[UpdateOne] = []
+    pending: List[Dict[str, Any]] = []
+    reclaimed: List[Dict[str, Any]] = []
+    for n, (_id, i) in enumerate(wanted.items()):
+        b = found.get(_id)
+        if b is None:
+            results[i]["error"] = "Not found"
+            continue
+        if payload.items[i].action == "approve":
+            if b["status"] not in LIVE_STATUSES:
+                # rejected/no-show bookings released their slot; claim it again first
+                if not await reserve(get_async_db(), b["facility_code"], b["date"], _id, b["start_min"], b["end_min"]):
+                    results[i]["error"] = "Time slot not available"
+                    continue
+                reclaimed.append(b)
+            start_at = b.get("start_at")
+            change = {
+                "status": "approved",
+                "access_code": entropy[6 * n:6 * n + 6],
+                "no_show_deadline": start_at + timedelta(minutes=NO_SHOW_GRACE_MIN) if start_at else None,
+            }
+        else:
+            change = {"status": "rejected"}
+        # only applies if nobody changed the booking since it was read
+        ops.append(UpdateOne({"_id": _id, "status": b["status"]}, {"$set": change}))
+        pending.append({**b, **change, "access_code": change.get("access_code"), "_index": i})
+
+    failed_ops = set()
+    if ops:
+        try:
+            details = (await get_async_db()["booking"].bulk_write(ops, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for err in details.get("writeErrors", []):
+                failed_ops.add(err["index"])
+                results[pending[err["index"]]["_index"]]["error"] = err.get("errmsg", "Write failed")
+        if details.get("nMatched", 0) < len(ops) - len(failed_ops):
+            # some conditional updates missed; find out which from the current state
+            current = {d["_id"]: d async for d in get_async_db()["booking"].find(
+                {"_id": {"$in": [b["_id"] for b in pending]}}, {"status": 1, "access_code": 1})}
+            for n, b in enumerate(pending):
+                d = current.get(b["_id"], {})
+                applied = d.get("status") == b["status"] and (b["status"] != "approved" or d.get("access_code") == b["access_code"])
+                if n not in failed_ops and not applied:
+                    failed_ops.add(n)
+                    results[b["_index"]]["error"] = "Booking changed concurrently, retry"
+    done = [b for n, b in enumerate(pending) if n not in failed_ops]
+    applied_ids = {b["_id"] for b in done}
+    await release_many(get_async_db(), [b for b in reclaimed if b["_id"] not in applied_ids])
+    for b in done:
+        results[b["_index"]]["ok"] = True
+
+    for b in done:
+        if b["status"] == "approved":
+            noshow_queue.schedule(b["_id"], b["no_show_deadline"])
+        else:
+            noshow_queue.cancel(b["_id"])
+    await release_many(get_async_db(), [b for b in done if b["status"] == "rejected"])
+    for key in {(b["facility_code"], b["date"]) for b in done}:
+        await availability_cache.invalidate(*key)
+    await notify_user_status_many(done)
+
+    succeeded = len(done)
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
 # -------------------------------
 # Access control integration (check-in)
 # -------------------------------
@@ -325,21 +859,28 @@ class CheckInPayload(BaseModel):
 
 
 @app.post("/api/bookings/{booking_id}/check-in")
-def check_in(booking_id: str, payload: CheckInPayload):
+async def check_in(booking_id: str, payload: CheckInPayload):
     try:
         _id = ObjectId(booking_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid booking id")
 
-    b = db["booking"].find_one({"_id": _id})
-    if not b:
-        raise HTTPException(status_code=404, detail="Not found")
-    if b.get("status") != "approved":
-        raise HTTPException(status_code=400, detail="Booking not approved")
-    if b.get("access_code") != payload.access_code:
+    checked_in = await find_one_and_update_async(
+        "booking",
+        {"_id": _id, "status": "approved", "access_code": payload.access_code},
+        {"$set": {"checked_in_at": datetime.utcnow()}, "$unset": {"no_show_deadline": ""}},
+        projection={"_id": 1},
+    )
+    if not checked_in:
+        # slow path only: find out why the conditional update missed
+        b = await get_async_db()["booking"].find_one({"_id": _id}, {"status": 1})
+        if not b:
+            raise HTTPException(status_code=404, detail="Not found")
+        if b.get("status") != "approved":
+            raise HTTPException(status_code=400, detail="Booking not approved")
         raise HTTPException(status_code=403, detail="Invalid access code")
 
-    db["booking"].update_one({"_id": _id}, {"$set": {"checked_in_at": datetime.utcnow()}})
+    noshow_queue.cancel(_id)
     return {"message": "Check-in recorded"}
 
 
@@ -350,34 +891,103 @@ def check_in(booking_id: str, payload: CheckInPayload):
 NO_SHOW_GRACE_MIN = int(os.getenv("NO_SHOW_GRACE_MIN", "15"))
 
 
-def sweep_noshows():
-    today = datetime.utcnow().date()
-    # find approved bookings for today or earlier that have started and not checked-in
-    rows = list(db["booking"].find({
-        "status": "approved",
-        "checked_in_at": {"$exists": False}
-    }))
+SWEEP_CHUNK = 1000
+
+
+async def sweep_noshows(booking_ids: Optional[List[ObjectId]] = None) -> List[str]:
+    """Mark approved bookings past their no-show deadline; returns affected ids
+
+    With ``booking_ids`` only those bookings are considered (deadline queue
+    expiry); without, every expired booking is swept (reconciliation).
+    """
     now = datetime.utcnow()
-    changed = 0
-    for b in rows:
-        b_date = datetime.strptime(b["date"], "%Y-%m-%d").date()
-        start_dt_local = to_local_dt(b["date"], b["start_time"])  # assume server local
-        if b_date <= today and now >= (start_dt_local + timedelta(minutes=NO_SHOW_GRACE_MIN)):
-            db["booking"].update_one({"_id": b["_id"]}, {"$set": {"status": "no_show"}})
-            changed += 1
-    if changed:
-        print(f"[SWEEP] Marked {changed} bookings as no_show")
-    return changed
+    # no_show_deadline is set on approval and removed on check-in, so the
+    # {status, no_show_deadline} index yields exactly the expired bookings
+    due = {"status": "approved", "no_show_deadline": {"$lte": now}, "checked_in_at": None}
+    if booking_ids is not None:
+        due["_id"] = {"$in": booking_ids}
+    rows = await get_async_db()["booking"].find(due, {"facility_code": 1, "date": 1}).to_list(length=None)
+    swept: List[Dict[str, Any]] = []
+    for i in range(0, len(rows), SWEEP_CHUNK):
+        chunk = rows[i:i + SWEEP_CHUNK]
+        ids = [b["_id"] for b in chunk]
+        result = await get_async_db()["booking"].update_many(
+            {**due, "_id": {"$in": ids}},
+            {"$set": {"status": "no_show"}, "$unset": {"no_show_deadline": ""}},
+        )
+        if result.modified_count != len(ids):
+            # some bookings were checked in meanwhile; keep only the ones we flipped
+            flipped = {d["_id"] async for d in get_async_db()["booking"].find({"_id": {"$in": ids}, "status": "no_show"}, {"_id": 1})}
+            chunk = [b for b in chunk if b["_id"] in flipped]
+        swept.extend(chunk)
+    if swept:
+        await release_many(get_async_db(), swept)
+        for key in {(b["facility_code"], b["date"]) for b in swept}:
+            await availability_cache.invalidate(*key)
+        print(f"[SWEEP] Marked {len(swept)} bookings as no_show")
+    return [str(b["_id"]) for b in swept]
 
 
 @app.get("/api/sweep")
-def api_sweep():
-    changed = sweep_noshows()
-    return {"changed": changed}
+async def api_sweep():
+    ids = await sweep_noshows()
+    return {"changed": len(ids), "ids": ids}
+
+
+# -------------------------------
+# Background jobs
+# -------------------------------
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+# Expiry is driven by noshow_queue; the periodic sweep only reconciles
+# bookings this worker never saw (other workers, restarts, missed events).
+SWEEP_INTERVAL_SEC = float(os.getenv("SWEEP_INTERVAL_SEC", "300"))
+NOSHOW_LOAD_HORIZON_HOURS = int(os.getenv("NOSHOW_LOAD_HORIZON_HOURS", "24"))
+
+noshow_queue = DeadlineQueue(sweep_noshows)
+
+
+async def load_noshow_deadlines() -> int:
+    """Queue deadlines of approved bookings expiring within the load horizon"""
+    horizon = datetime.utcnow() + timedelta(hours=NOSHOW_LOAD_HORIZON_HOURS)
+    cursor = get_async_db()["booking"].find(
+        {"status": "approved", "no_show_deadline": {"$ne": None, "$lte": horizon}, "checked_in_at": None},
+        {"no_show_deadline": 1},
+    )
+    loaded = 0
+    async for b in cursor:
+        noshow_queue.schedule(b["_id"], b["no_show_deadline"])
+        loaded += 1
+    return loaded
+
+
+async def reconcile_noshows() -> List[str]:
+    swept = await sweep_noshows()
+    await load_noshow_deadlines()
+    return swept
+
+
+scheduler = Scheduler()
+scheduler.add_job("reconcile_noshows", SWEEP_INTERVAL_SEC, reconcile_noshows)
+if ADMIN_NOTIFY_MODE == "digest":
+    # check often enough that no digest waits much past ADMIN_DIGEST_MAX_SECONDS
+    scheduler.add_job("flush_admin_digest", max(5.0, admin_digest.max_age_seconds / 5),
+                      lambda: admin_digest.flush_if_due(get_async_db()))
+
+
+@app.get("/api/metrics")
+async def metrics():
+    return {
+        "availability_cache": availability_cache.stats(),
+        "scheduler": scheduler.stats(),
+        "noshow_queue": noshow_queue.stats(),
+        "outbox": await outbox_worker.stats(),
+        "smtp_pool": smtp_pool.stats() if smtp_pool is not None else None,
+    }
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -387,12 +997,13 @@ def test_database():
         "collections": []
     }
     try:
-        if db is not None:
+        async_db = get_async_db()
+        if async_db is not None:
             response["database"] = "✅ Connected & Working"
             response["database_url"] = "✅ Set"
-            response["database_name"] = db.name
+            response["database_name"] = async_db.name
             response["connection_status"] = "Connected"
-            response["collections"] = db.list_collection_names()
+            response["collections"] = await async_db.list_collection_names()
         else:
             response["database"] = "❌ Not Configured"
     except Exception as e:
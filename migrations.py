@@ -0,0 +1,124 @@
+"""
+Data Migrations
+
+Idempotent backfills for documents written before a field existed. They
+run at startup and can also be invoked directly:
+
+    python migrations.py
+
+One-off backfills that have to scan for their rows record a marker document
+in the "migration" collection once they complete, so later startups skip
+them; the command line re-runs them regardless.
+"""
+
+import os
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+
+from occupancy import parse_hhmm
+
+BATCH_SIZE = 1000
+MIGRATION_COLLECTION = "migration"
+
+# Booking dates and times are wall-clock times where the facilities are
+FACILITY_TZ = ZoneInfo(os.getenv("FACILITY_TZ", "UTC"))
+
+
+def booking_time_fields(date_str: str, start_time: str, end_time: str) -> dict:
+    """Numeric start/end minutes and start timestamp for a booking
+
+    ``start_at`` is the local start time (FACILITY_TZ) converted to UTC and
+    stored naive, like every other timestamp compared against utcnow().
+    Raises ValueError unless the date is YYYY-MM-DD and the times HH:MM.
+    """
+    # strptime and the round trip, since fromisoformat also takes forms like
+    # 2031-W01-1 that would name the same day under a different string
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    if day.isoformat() != date_str:
+        raise ValueError(f"Invalid date {date_str!r}, expected YYYY-MM-DD")
+    start_min = parse_hhmm(start_time)
+    local = datetime(day.year, day.month, day.day, start_min // 60, start_min % 60, tzinfo=FACILITY_TZ)
+    return {
+        "start_min": start_min,
+        "end_min": parse_hhmm(end_time),
+        "start_at": local.astimezone(timezone.utc).replace(tzinfo=None),
+    }
+
+
+async def _completed(db, name: str) -> bool:
+    return await db[MIGRATION_COLLECTION].find_one({"_id": name}) is not None
+
+
+async def _mark_completed(db, name: str, **info) -> None:
+    await db[MIGRATION_COLLECTION].update_one(
+        {"_id": name},
+        {"$set": {"completed_at": datetime.utcnow(), **info}},
+        upsert=True,
+    )
+
+
+async def backfill_booking_minutes(db, force: bool = False) -> int:
+    """Add start_min/end_min/start_at to bookings that lack them
+
+    Runs once: the scan is unindexed and every booking written since has the
+    fields. Rows that cannot be parsed are logged and left as they are.
+    """
+    if not force and await _completed(db, "booking_minutes"):
+        return 0
+    cursor = db["booking"].find(
+        {"start_min": None},
+        {"date": 1, "start_time": 1, "end_time": 1},
+    )
+    ops = []
+    updated = skipped = 0
+    async for b in cursor:
+        try:
+            fields = booking_time_fields(b["date"], b["start_time"], b["end_time"])
+        except ValueError as e:
+            print("[MIGRATION ERROR]", b["_id"], e)
+            skipped += 1
+            continue
+        ops.append(UpdateOne({"_id": b["_id"]}, {"$set": fields}))
+        if len(ops) >= BATCH_SIZE:
+            updated += (await db["booking"].bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await db["booking"].bulk_write(ops, ordered=False)).modified_count
+    await _mark_completed(db, "booking_minutes", updated=updated, skipped=skipped)
+    return updated
+
+
+async def backfill_noshow_deadlines(db, grace_min: int) -> int:
+    """Set no_show_deadline on approved, not-yet-checked-in bookings that lack it"""
+    result = await db["booking"].update_many(
+        {
+            "status": "approved",
+            "checked_in_at": None,
+            "no_show_deadline": None,
+            "start_at": {"$ne": None},
+        },
+        [{"$set": {"no_show_deadline": {"$add": ["$start_at", grace_min * 60 * 1000]}}}],
+    )
+    return result.modified_count
+
+
+if __name__ == "__main__":
+    import asyncio
+    import os
+    from database import close_clients, get_async_db
+
+    async_db = get_async_db()
+    if async_db is None:
+        raise SystemExit("Database not configured")
+    grace_min = int(os.getenv("NO_SHOW_GRACE_MIN", "15"))
+
+    async def _run():
+        print("Backfilled time fields:", await backfill_booking_minutes(async_db, force=True))
+        print("Backfilled no-show deadlines:", await backfill_noshow_deadlines(async_db, grace_min))
+
+    try:
+        asyncio.run(_run())
+    finally:
+        close_clients()
@@ -0,0 +1,108 @@
+"""
+Occupancy Engine
+
+Sort-and-merge interval arithmetic on integer minutes since midnight.
+Given a day's bookings this produces the merged busy blocks, the free gaps
+inside operating hours and whether the day is fully occupied, in
+O(n log n) instead of walking the day minute by minute.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Interval = Tuple[int, int]
+Slot = Tuple[str, int, str]
+
+
+def to_minutes(t: str) -> int:
+    """'HH:MM' -> minutes since midnight"""
+    h, m = t.split(":")
+    return int(h) * 60 + int(m)
+
+
+def parse_hhmm(t: str) -> int:
+    """Strict 'HH:MM' (00:00-23:59) -> minutes since midnight; ValueError otherwise"""
+    if len(t) != 5 or t[2] != ":" or not (t[:2] + t[3:]).isdigit():
+        raise ValueError(f"Invalid time {t!r}, expected HH:MM")
+    h, m = int(t[:2]), int(t[3:])
+    if h > 23 or m > 59:
+        raise ValueError(f"Invalid time {t!r}, expected HH:MM")
+    return h * 60 + m
+
+
+def to_hhmm(minutes: int) -> str:
+    """Minutes since midnight -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Merge overlapping or touching half-open intervals; empty ones are dropped"""
+    merged: List[Interval] = []
+    for s, e in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def free_gaps(busy: List[Interval], open_min: int, close_min: int) -> List[Interval]:
+    """Gaps between merged busy blocks within [open_min, close_min)"""
+    gaps: List[Interval] = []
+    cursor = open_min
+    for s, e in busy:
+        if e <= cursor:
+            continue
+        if s >= close_min:
+            break
+        if s > cursor:
+            gaps.append((cursor, s))
+        cursor = max(cursor, e)
+    if cursor < close_min:
+        gaps.append((cursor, close_min))
+    return gaps
+
+
+def day_occupancy(intervals: Iterable[Interval], open_min: int, close_min: int) -> Dict[str, Any]:
+    """Busy blocks, free gaps and fully-occupied flag for one facility/day.
+
+    Intervals are clipped to operating hours before merging, so bookings
+    spilling past opening or closing time do not show up as busy outside it.
+    """
+    clipped = ((max(s, open_min), min(e, close_min)) for s, e in intervals)
+    busy = merge_intervals(clipped)
+    free = free_gaps(busy, open_min, close_min)
+    return {
+        "busy": busy,
+        "free": free,
+        "fully_occupied": close_min > open_min and not free,
+    }
+
+
+def as_hhmm_blocks(blocks: List[Interval]) -> List[Dict[str, str]]:
+    return [{"start": to_hhmm(s), "end": to_hhmm(e)} for s, e in blocks]
+
+
+def earliest_slots(intervals: Dict[Tuple[str, str], List[Interval]], codes: Sequence[str], days: Sequence[str],
+                   duration: int, lo: int, hi: int, limit: int,
+                   not_before: Optional[Tuple[str, int]] = None) -> List[Slot]:
+    """Earliest ``limit`` (date, start, facility_code) starts of ``duration`` free minutes
+
+    ``intervals`` maps (facility_code, date) to busy intervals; every free gap
+    within [lo, hi) long enough yields its first start. ``not_before`` is a
+    (date, minute) before which nothing is offered.
+    """
+    slots: List[Slot] = []
+    for d in days:
+        if not_before is not None and d < not_before[0]:
+            continue
+        day_lo = max(lo, not_before[1]) if not_before is not None and d == not_before[0] else lo
+        for code in codes:
+            for s, e in day_occupancy(intervals.get((code, d), []), day_lo, hi)["free"]:
+                if e - s >= duration:
+                    slots.append((d, s, code))
+        # days are scanned in order, so once enough slots are found later days cannot beat them
+        if len(slots) >= limit:
+            break
+    slots.sort()
+    return slots[:limit]
@@ -0,0 +1,184 @@
+"""
+Email Outbox
+
+Request handlers never talk to SMTP. They insert a message into the
+"outbox" collection next to the booking change, and ``OutboxWorker``
+delivers it in the background:
+
+- messages are claimed atomically, so any number of workers can drain the
+  same outbox without sending twice
+- a claim is a lease: a worker that dies mid-send leaves the message to be
+  picked up again once ``next_attempt_at`` passes. Messages are claimed
+  one at a time, right before they are sent, so a claim only has to
+  outlive a single send (``claim_seconds`` must exceed the SMTP timeout),
+  and results are only recorded while the claim is still held
+- failures are retried with exponential backoff up to ``max_attempts``,
+  after which the message is parked as "failed"
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+OUTBOX_COLLECTION = "outbox"
+
+
+def _message(to: str, subject: str, body: str, now: datetime) -> Dict[str, Any]:
+    return {
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "last_error": None,
+    }
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        send: Callable[[str, str, str], Any],
+        concurrency: int = 4,
+        batch_size: int = 50,
+        max_attempts: int = 6,
+        backoff_base_seconds: float = 30,
+        backoff_max_seconds: float = 3600,
+        claim_seconds: float = 120,
+        poll_seconds: float = 5,
+    ):
+        self.send = send
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.claim_seconds = claim_seconds
+        self.poll_seconds = poll_seconds
+        self.db = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.claims_lost = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, db, to: str, subject: str, body: str) -> None:
+        await db[OUTBOX_COLLECTION].insert_one(_message(to, subject, body, datetime.utcnow()))
+        self._wakeup.set()
+
+    async def enqueue_many(self, db, messages: List[Dict[str, str]]) -> None:
+        """Insert several {"to", "subject", "body"} messages in one round trip"""
+        if not messages:
+            return
+        now = datetime.utcnow()
+        await db[OUTBOX_COLLECTION].insert_many(
+            [_message(m["to"], m["subject"], m["body"], now) for m in messages], ordered=False
+        )
+        self._wakeup.set()
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.db[OUTBOX_COLLECTION].find_one_and_update(
+            # "sending" rows whose claim expired belong to a worker that died
+            {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=self.claim_seconds)}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _record(self, msg: Dict[str, Any], update: Dict[str, Any]) -> None:
+        # only while our claim holds; after it expires another worker owns the message
+        result = await self.db[OUTBOX_COLLECTION].update_one(
+            {"_id": msg["_id"], "status": "sending", "next_attempt_at": msg["next_attempt_at"]}, update
+        )
+        if not result.matched_count:
+            self.claims_lost += 1
+            print("[OUTBOX ERROR] Claim expired before the result was recorded:", msg["_id"])
+
+    async def _deliver(self, msg: Dict[str, Any]) -> None:
+        try:
+            await asyncio.to_thread(self.send, msg["to"], msg["subject"], msg["body"])
+        except Exception as e:
+            attempts = msg.get("attempts", 0) + 1
+            update: Dict[str, Any] = {"attempts": attempts, "last_error": str(e)[:200]}
+            if attempts >= self.max_attempts:
+                update["status"] = "failed"
+                self.failed += 1
+            else:
+                delay = min(self.backoff_base_seconds * 2 ** (attempts - 1), self.backoff_max_seconds)
+                update["status"] = "pending"
+                update["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+                self.retried += 1
+            print("[OUTBOX ERROR]", msg["to"], e)
+            await self._record(msg, {"$set": update})
+            return
+        self.sent += 1
+        await self._record(msg, {"$set": {"status": "sent", "sent_at": datetime.utcnow()}, "$inc": {"attempts": 1}})
+
+    async def _drain_slot(self, budget: List[int]) -> int:
+        delivered = 0
+        while budget[0] > 0:
+            budget[0] -= 1
+            msg = await self._claim()
+            if msg is None:
+                break
+            await self._deliver(msg)
+            delivered += 1
+        return delivered
+
+    async def drain_once(self) -> int:
+        """Deliver up to ``batch_size`` due messages, ``concurrency`` at a time
+
+        Each slot claims its next message only when it is ready to send it,
+        so at most ``concurrency`` claims are outstanding.
+        """
+        budget = [self.batch_size]
+        return sum(await asyncio.gather(*(self._drain_slot(budget) for _ in range(self.concurrency))))
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                print("[OUTBOX ERROR]", e)
+                drained = 0
+            if drained:
+                continue
+            # not wait_for: on 3.11 it swallows a cancel that races with set(),
+            # which made stop() hang when a message was queued during shutdown
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait([waiter], timeout=self.poll_seconds)
+            finally:
+                waiter.cancel()
+
+    def start(self, db) -> None:
+        self.db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"sent": self.sent, "retried": self.retried, "failed": self.failed,
+                               "claims_lost": self.claims_lost}
+        if self.db is None:
+            return out
+        coll = self.db[OUTBOX_COLLECTION]
+        out["depth"] = await coll.count_documents({"status": {"$in": ["pending", "sending"]}})
+        oldest = await coll.find_one(
+            {"status": {"$in": ["pending", "sending"]}},
+            {"created_at": 1},
+            sort=[("created_at", 1)],
+        )
+        out["lag_seconds"] = (datetime.utcnow() - oldest["created_at"]).total_seconds() if oldest else 0
+        return out
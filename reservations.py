@@ -0,0 +1,94 @@
+"""
+Slot Reservations
+
+One document per facility/day in the "reservation" collection holds the
+intervals of every live (pending or approved) booking:
+
+    {"facility_code": "MR-1", "date": "2025-01-31",
+     "intervals": [{"booking_id": ObjectId, "start": 540, "end": 600}, ...]}
+
+A unique index on (facility_code, date) plus a conditional ``$push`` lets
+MongoDB enforce "no overlapping bookings" atomically in a single round trip,
+so concurrent requests for the same slot cannot both succeed.
+"""
+
+from typing import Any, Dict, Iterable
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+RESERVATION_COLLECTION = "reservation"
+LIVE_STATUSES = ["pending", "approved"]
+
+
+def _free_filter(facility_code: str, date_str: str, start: int, end: int) -> dict:
+    return {
+        "facility_code": facility_code,
+        "date": date_str,
+        "intervals": {"$not": {"$elemMatch": {"start": {"$lt": end}, "end": {"$gt": start}}}},
+    }
+
+
+async def reserve(db, facility_code: str, date_str: str, booking_id: ObjectId, start: int, end: int) -> bool:
+    """Atomically claim [start, end) minutes; False if it overlaps a live booking"""
+    coll = db[RESERVATION_COLLECTION]
+    push = {"$push": {"intervals": {"booking_id": booking_id, "start": start, "end": end}}}
+    try:
+        await coll.update_one(_free_filter(facility_code, date_str, start, end), push, upsert=True)
+        return True
+    except DuplicateKeyError:
+        # Either the day document exists and the slot overlaps (the filter did
+        # not match, so the upsert tried to insert a duplicate), or another
+        # request created the day document first. Retry once without upsert
+        # to tell the two apart.
+        result = await coll.update_one(_free_filter(facility_code, date_str, start, end), push)
+        return result.modified_count == 1
+
+
+async def release(db, facility_code: str, date_str: str, booking_id: Any) -> None:
+    """Free the interval held by a booking (rejected, cancelled, no-show...)"""
+    await db[RESERVATION_COLLECTION].update_one(
+        {"facility_code": facility_code, "date": date_str},
+        {"$pull": {"intervals": {"booking_id": booking_id}}},
+    )
+
+
+async def release_many(db, bookings: Iterable[Dict[str, Any]]) -> None:
+    """Release several bookings at once, one $pull per facility/day in a single bulk write"""
+    by_day: Dict[tuple, list] = {}
+    for b in bookings:
+        by_day.setdefault((b["facility_code"], b["date"]), []).append(b["_id"])
+    if not by_day:
+        return
+    await db[RESERVATION_COLLECTION].bulk_write([
+        UpdateOne({"facility_code": code, "date": d}, {"$pull": {"intervals": {"booking_id": {"$in": ids}}}})
+        for (code, d), ids in by_day.items()
+    ], ordered=False)
+
+
+async def backfill_reservations(db) -> int:
+    """Build reservation documents from existing live bookings.
+
+    Only needed once, for bookings created before reservations existed; it
+    is a no-op when the reservation collection already has data.
+    """
+    if await db[RESERVATION_COLLECTION].estimated_document_count() > 0:
+        return 0
+    days: dict = {}
+    cursor = db["booking"].find(
+        {"status": {"$in": LIVE_STATUSES}},
+        {"facility_code": 1, "date": 1, "start_min": 1, "end_min": 1},
+    )
+    async for b in cursor:
+        days.setdefault((b["facility_code"], b["date"]), []).append({
+            "booking_id": b["_id"],
+            "start": b["start_min"],
+            "end": b["end_min"],
+        })
+    if days:
+        await db[RESERVATION_COLLECTION].insert_many([
+            {"facility_code": code, "date": d, "intervals": intervals}
+            for (code, d), intervals in days.items()
+        ])
+    return len(days)
@@ -0,0 +1,139 @@
+"""
+Background Scheduler
+
+Runs periodic jobs (such as the no-show sweep) inside the app's event loop.
+Every uvicorn worker runs the scheduler, but before each run a job must hold
+a lease document in the "lease" collection, so only one worker per cluster
+does the work. The holder renews the lease on every run; if it dies, the
+lease expires and another worker takes over.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+LEASE_COLLECTION = "lease"
+
+
+class Lease:
+    def __init__(self, db, name: str, owner: str, ttl_seconds: float):
+        self.db = db
+        self.name = name
+        self.owner = owner
+        self.ttl_seconds = ttl_seconds
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; False while another owner holds it"""
+        now = datetime.utcnow()
+        try:
+            await self.db[LEASE_COLLECTION].find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            # the lease exists, is unexpired and belongs to someone else
+            return False
+
+    async def release(self) -> None:
+        await self.db[LEASE_COLLECTION].delete_one({"_id": self.name, "owner": self.owner})
+
+
+class Job:
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_affected: Optional[int] = None
+        self.total_affected = 0
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_not_leader": self.skipped,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_affected": self.last_affected,
+            "total_affected": self.total_affected,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    def __init__(self, lease_ttl_factor: float = 3):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_ttl_factor = lease_ttl_factor
+        self.jobs: List[Job] = []
+        self._tasks: List[asyncio.Task] = []
+        self._leases: List[Lease] = []
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[Any]]) -> None:
+        self.jobs.append(Job(name, interval_seconds, func))
+
+    async def start(self, db) -> None:
+        for job in self.jobs:
+            lease = Lease(db, f"job:{job.name}", self.owner, job.interval_seconds * self.lease_ttl_factor)
+            self._leases.append(lease)
+            self._tasks.append(asyncio.create_task(self._loop(job, lease)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # hand leadership over immediately instead of waiting for expiry
+        for lease in self._leases:
+            try:
+                await lease.release()
+            except Exception as e:
+                print("[SCHEDULER ERROR]", e)
+        self._leases = []
+
+    async def _loop(self, job: Job, lease: Lease) -> None:
+        while True:
+            await asyncio.sleep(job.interval_seconds)
+            try:
+                if not await lease.acquire():
+                    job.skipped += 1
+                    continue
+            except Exception as e:
+                print("[SCHEDULER ERROR]", job.name, e)
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job: Job) -> None:
+        job.last_run_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            result = await job.func()
+            affected = len(result) if isinstance(result, (list, tuple, set)) else int(result or 0)
+            job.last_affected = affected
+            job.total_affected += affected
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)[:200]
+            print("[SCHEDULER ERROR]", job.name, e)
+        finally:
+            job.runs += 1
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"owner": self.owner, "jobs": {job.name: job.stats() for job in self.jobs}}
@@ -6,7 +6,7 @@ Copy and modify these examples for your specific needs.
 """
 
 from datetime import datetime
-from database import create_document, get_documents, update_document, delete_document
+from database import create_document, get_documents, find_one_document, update_document, delete_document
 
 # =============================================================================
 # USER MANAGEMENT SCHEMA
@@ -33,8 +33,7 @@ def create_user(name: str, email: str, password_hash: str):
 
 def get_user_by_email(email: str):
     """Get user by email"""
-    users = get_documents("users", {"email": email})
-    return users[0] if users else None
+    return find_one_document("users", {"email": email})
 
 # =============================================================================
 # BLOG/CMS SCHEMA
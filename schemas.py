@@ -44,9 +44,13 @@ class Booking(BaseModel):
     date: str = Field(..., description="ISO date YYYY-MM-DD")
     start_time: str = Field(..., description="HH:MM 24h")
     end_time: str = Field(..., description="HH:MM 24h")
+    start_min: Optional[int] = Field(None, description="Start as minutes since midnight")
+    end_min: Optional[int] = Field(None, description="End as minutes since midnight")
+    start_at: Optional[datetime] = Field(None, description="Start timestamp, UTC (naive) converted from FACILITY_TZ local time")
     status: Literal["pending", "approved", "rejected", "cancelled", "no_show"] = "pending"
     access_code: Optional[str] = Field(None, description="Code used at entry gates")
     checked_in_at: Optional[datetime] = None
+    no_show_deadline: Optional[datetime] = Field(None, description="Auto-cancel time if not checked in; set on approval")
 
 class AdminAction(BaseModel):
     action: Literal["approve", "reject"]
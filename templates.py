@@ -0,0 +1,99 @@
+"""
+Email Templates
+
+Notification bodies are compiled once at import and rendered with
+auto-escaping: every substituted value is HTML-escaped unless it is a
+``Safe`` fragment produced by another template. Fragments that only depend
+on the facility are cached, and ``render_many`` renders a batch of
+recipients in one pass.
+"""
+
+import html
+import string
+import textwrap
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Safe(str):
+    """Already-escaped HTML, inserted verbatim"""
+
+
+def _escape(value: Any) -> str:
+    if isinstance(value, Safe):
+        return value
+    return html.escape("" if value is None else str(value))
+
+
+class HtmlTemplate:
+    def __init__(self, source: str):
+        self._template = string.Template(textwrap.dedent(source).strip())
+
+    def render(self, **values: Any) -> Safe:
+        return Safe(self._template.substitute({k: _escape(v) for k, v in values.items()}))
+
+    def render_many(self, rows: Iterable[Dict[str, Any]]) -> List[Safe]:
+        return [self.render(**row) for row in rows]
+
+
+ADMIN_NEW_BOOKING = HtmlTemplate("""
+    <h3>New Booking Request</h3>
+    <p><b>Facility:</b> $facility</p>
+    <p><b>Date:</b> $date $start_time-$end_time</p>
+    <p><b>User:</b> $user_name (ID: $user_id)</p>
+    <p><b>Purpose:</b> $purpose</p>
+    <p>Please review in the admin panel.</p>
+""")
+
+ADMIN_DIGEST = HtmlTemplate("""
+    <h3>New Booking Requests</h3>
+    $sections
+    <p>Please review in the admin panel.</p>
+""")
+
+DIGEST_SECTION = HtmlTemplate("<h4>$facility on $date</h4><ul>$lines</ul>")
+
+DIGEST_LINE = HtmlTemplate("<li>$start_time-$end_time: $user_name (ID: $user_id) - $purpose</li>")
+
+USER_STATUS = HtmlTemplate("""
+    <p>Your booking request for $facility on <b>$date $start_time-$end_time</b> has been <b>$status</b>.</p>
+    $access_code
+""")
+
+ACCESS_CODE = HtmlTemplate("<p><b>Access code:</b> $code</p>")
+
+
+@lru_cache(maxsize=1024)
+def facility_label(facility_code: str) -> Safe:
+    """Escaped facility code, rendered once per facility"""
+    return Safe(html.escape(facility_code))
+
+
+@lru_cache(maxsize=1024)
+def facility_fragment(facility_code: str) -> Safe:
+    """Bold facility label, rendered once per facility"""
+    return Safe(f"<b>{facility_label(facility_code)}</b>")
+
+
+def booking_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Template values shared by admin notifications"""
+    return {
+        "facility": facility_label(data["facility_code"]),
+        "date": data["date"],
+        "start_time": data["start_time"],
+        "end_time": data["end_time"],
+        "user_name": data["user_name"],
+        "user_id": data.get("user_id") or "-",
+        "purpose": data.get("purpose") or "-",
+    }
+
+
+def user_status_values(status: str, facility_code: str, date_str: str, start: str, end: str, access_code: Optional[str]) -> Dict[str, Any]:
+    return {
+        "facility": facility_fragment(facility_code),
+        "date": date_str,
+        "start_time": start,
+        "end_time": end,
+        "status": status,
+        "access_code": ACCESS_CODE.render(code=access_code) if access_code else Safe(""),
+    }
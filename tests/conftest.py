@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def mongo_db():
+    """Scratch database on a real MongoDB (TEST_DATABASE_URL), dropped afterwards"""
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=2000)
+    db = client[f"test_{os.getpid()}"]
+    try:
+        yield db
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def _mongomock_date_add():
+    """mongomock's $add rejects dates; MongoDB adds milliseconds to them"""
+    import mongomock.aggregate as aggregate
+
+    handle = aggregate._Parser._handle_arithmetic_operator
+    if getattr(handle, "date_add", False):
+        return
+
+    def handle_with_dates(self, operator, values):
+        if operator == "$add":
+            parsed = [self.parse(v) for v in values]
+            dates = [v for v in parsed if isinstance(v, datetime)]
+            if dates:
+                return dates[0] + timedelta(milliseconds=sum(v for v in parsed if not isinstance(v, datetime)))
+        return handle(self, operator, values)
+
+    handle_with_dates.date_add = True
+    aggregate._Parser._handle_arithmetic_operator = handle_with_dates
+
+
+@pytest.fixture
+def mock_db():
+    """In-memory mongomock-motor database"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    _mongomock_date_add()
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+
+@pytest.fixture
+def app_db(mock_db, monkeypatch):
+    """mock_db installed as the app's database"""
+    import database
+
+    monkeypatch.setattr(database, "_async_db", mock_db)
+    return mock_db
+
+
+@pytest.fixture
+async def client(app_db):
+    """API client over the in-memory database, with the app lifespan running"""
+    httpx = pytest.importorskip("httpx")
+    import main
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            await c.post("/api/facilities/seed")
+            yield c
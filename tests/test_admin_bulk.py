@@ -0,0 +1,59 @@
+import pytest
+from bson import ObjectId
+
+import database
+
+pytestmark = pytest.mark.anyio
+
+BOOKING = {"facility_code": "MR-2", "user_id": "u1", "user_name": "Test User", "user_email": "u1@example.com"}
+
+
+async def book(client, date_str, start, end):
+    r = await client.post("/api/bookings", json={**BOOKING, "date": date_str, "start_time": start, "end_time": end})
+    assert r.status_code == 200
+    return r.json()["booking_id"]
+
+
+async def bulk(client, *items):
+    r = await client.post("/api/admin/bookings/bulk", json={"items": [{"booking_id": b, "action": a} for b, a in items]})
+    assert r.status_code == 200
+    return r.json()
+
+
+async def test_approve_and_reject(client):
+    a = await book(client, "2031-04-01", "09:00", "10:00")
+    b = await book(client, "2031-04-01", "10:00", "11:00")
+    out = await bulk(client, (a, "approve"), (b, "reject"), ("0" * 24, "approve"), ("bad", "reject"))
+    assert out["succeeded"] == 2 and out["failed"] == 2
+    assert [r["ok"] for r in out["results"]] == [True, True, False, False]
+
+
+async def test_reject_email_has_no_access_code(client):
+    b = await book(client, "2031-04-02", "09:00", "10:00")
+    await bulk(client, (b, "approve"))
+    await bulk(client, (b, "reject"))
+    outbox = database.get_async_db()["outbox"]
+    rejected = await outbox.find_one({"to": "u1@example.com", "subject": "Your booking has been rejected"})
+    approved = await outbox.find_one({"to": "u1@example.com", "subject": "Your booking has been approved"})
+    assert "Access code" in approved["body"]
+    assert "Access code" not in rejected["body"]
+
+
+async def test_reapprove_reclaims_slot(client):
+    b = await book(client, "2031-04-03", "09:00", "10:00")
+    await bulk(client, (b, "reject"))
+    out = await bulk(client, (b, "approve"))
+    assert out["succeeded"] == 1
+    r = await client.post("/api/bookings", json={**BOOKING, "date": "2031-04-03", "start_time": "09:00", "end_time": "10:00"})
+    assert r.status_code == 409
+
+
+async def test_reapprove_conflict_is_reported(client):
+    b = await book(client, "2031-04-04", "09:00", "10:00")
+    await bulk(client, (b, "reject"))
+    await book(client, "2031-04-04", "09:30", "10:30")
+    out = await bulk(client, (b, "approve"))
+    assert out["succeeded"] == 0
+    assert out["results"][0]["error"] == "Time slot not available"
+    row = await database.get_async_db()["booking"].find_one({"_id": ObjectId(b)})
+    assert row["status"] == "rejected"
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from availability_cache import AvailabilityCache, InMemoryBackend
+
+pytestmark = pytest.mark.anyio
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = AvailabilityCache(ttl_seconds=30)
+    cache.set("MR-1", "2031-01-01", {"busy": []}, cache.epoch())
+    now[0] += 29
+    assert cache.get("MR-1", "2031-01-01") == {"busy": []}
+    now[0] += 2
+    assert cache.get("MR-1", "2031-01-01") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_result_read_across_invalidation_is_not_stored():
+    cache = AvailabilityCache()
+    epoch = cache.epoch()
+    cache._drop(("MR-1", "2031-01-01"))
+    cache.set("MR-1", "2031-01-01", {"busy": []}, epoch)
+    assert cache.get("MR-1", "2031-01-01") is None
+
+
+async def test_backend_fans_invalidations_out_to_every_cache():
+    backend = InMemoryBackend()
+    a, b = AvailabilityCache(backend=backend), AvailabilityCache(backend=backend)
+    for cache in (a, b):
+        cache.set("MR-1", "2031-01-01", {"busy": []}, cache.epoch())
+    await a.invalidate("MR-1", "2031-01-01")
+    assert a.get("MR-1", "2031-01-01") is None and b.get("MR-1", "2031-01-01") is None
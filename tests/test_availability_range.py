@@ -0,0 +1,69 @@
+"""Week/month availability: one range query, per-day summaries, latency budget"""
+
+import os
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import database
+import main
+from catalog import catalog
+from indexes import ensure_indexes
+
+pytestmark = pytest.mark.anyio
+
+# 31 days x 37 facilities on a real MongoDB, median of a few warm calls
+RANGE_BUDGET_MS = float(os.getenv("RANGE_BUDGET_MS", "250"))
+
+
+async def test_range_summaries(client):
+    for day, start, end in (("2031-05-02", "08:00", "15:00"), ("2031-05-02", "15:00", "22:00"), ("2031-05-03", "09:00", "10:00")):
+        r = await client.post("/api/bookings", json={
+            "facility_code": "MR-1", "user_id": "u1", "user_name": "Test User", "user_email": "u1@example.com",
+            "date": day, "start_time": start, "end_time": end,
+        })
+        assert r.status_code == 200, r.text
+
+    r = await client.get("/api/availability/range", params={"from": "2031-05-01", "to": "2031-05-07", "facility_code": ["MR-1", "MR-2"]})
+    assert r.status_code == 200
+    facilities = r.json()["facilities"]
+    assert [f["facility_code"] for f in facilities] == ["MR-1", "MR-2"]
+    mr1 = {d["date"]: d for d in facilities[0]["days"]}
+    assert len(mr1) == 7
+    assert mr1["2031-05-02"]["fully_occupied"] and mr1["2031-05-02"]["free"] == []
+    assert mr1["2031-05-03"]["busy"] == [{"start": "09:00", "end": "10:00"}]
+    assert not mr1["2031-05-03"]["fully_occupied"]
+    assert not any(d["fully_occupied"] for d in facilities[1]["days"])
+
+
+async def test_unknown_facility_is_404(client):
+    r = await client.get("/api/availability/range", params={"from": "2031-05-01", "to": "2031-05-07", "facility_code": ["MR-1", "NOPE-9"]})
+    assert r.status_code == 404
+
+
+async def test_month_by_37_facilities_within_budget(mongo_db, monkeypatch):
+    monkeypatch.setattr(database, "_async_db", mongo_db)
+    await ensure_indexes(mongo_db)
+    facilities = [f.model_dump() for f in main.DEFAULT_FACILITIES]
+    facilities += [{**facilities[-1], "code": f"EXTRA-{i}"} for i in range(37 - len(facilities))]
+    await mongo_db["facility"].insert_many(facilities)
+    first = date(2031, 6, 1)
+    await mongo_db["booking"].insert_many([
+        {"facility_code": f["code"], "date": (first + timedelta(days=d)).isoformat(),
+         "start_min": h * 60, "end_min": h * 60 + 45, "status": "approved"}
+        for f in facilities for d in range(31) for h in range(8, 22, 2)
+    ])
+    catalog.invalidate()
+    try:
+        timings = []
+        for _ in range(6):
+            started = time.perf_counter()
+            result = await main.availability_range(date_from=first.isoformat(), date_to=(first + timedelta(days=30)).isoformat(), facility_codes=None)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        catalog.invalidate()
+
+    assert len(result["facilities"]) == 37 and all(len(f["days"]) == 31 for f in result["facilities"])
+    median = sorted(timings[1:])[2]
+    assert median < RANGE_BUDGET_MS, f"median {median:.0f} ms over the {RANGE_BUDGET_MS:.0f} ms budget"
@@ -0,0 +1,44 @@
+"""Facility catalog: served from memory with an ETag, refreshed on TTL or invalidate()"""
+
+import pytest
+
+import main
+from catalog import catalog
+
+pytestmark = pytest.mark.anyio
+
+EXTRA = {"name": "Rooftop", "code": "RT-1", "type": "terrace", "location": "Roof"}
+
+
+async def test_seeding_invalidates_and_etag_revalidates(client):
+    # the lifespan loaded an empty catalog; seeding in the fixture must have invalidated it
+    r = await client.get("/api/facilities")
+    assert r.status_code == 200
+    assert len(r.json()) == len(main.DEFAULT_FACILITIES)
+    etag = r.headers["etag"]
+
+    r = await client.get("/api/facilities", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert r.headers["etag"] == etag
+
+
+async def test_direct_writes_show_after_invalidate(client, app_db):
+    etag = (await client.get("/api/facilities")).headers["etag"]
+    await app_db["facility"].insert_one(dict(EXTRA))
+    # still served from memory
+    assert (await client.get("/api/facilities", headers={"If-None-Match": etag})).status_code == 304
+
+    catalog.invalidate()
+    r = await client.get("/api/facilities", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+    assert "RT-1" in {f["code"] for f in r.json()}
+
+
+async def test_ttl_refresh(client, app_db, monkeypatch):
+    etag = (await client.get("/api/facilities")).headers["etag"]
+    await app_db["facility"].insert_one(dict(EXTRA))
+    monkeypatch.setattr(catalog, "ttl_seconds", 0)
+
+    r = await client.get("/api/facilities", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and "RT-1" in {f["code"] for f in r.json()}
+    assert (await client.get("/api/availability", params={"facility_code": "RT-1", "date": "2031-03-03"})).status_code == 200
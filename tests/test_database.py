@@ -0,0 +1,214 @@
+"""Client lifecycle (env-driven pool options, lazy creation, reconnect) and CRUD helpers"""
+
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne
+from pymongo.errors import BulkWriteError
+
+import database
+
+
+class FakeClient:
+    created = []
+
+    def __init__(self, url, **options):
+        self.url, self.options, self.closed = url, options, False
+        FakeClient.created.append(self)
+
+    def __getitem__(self, name):
+        return (self, name)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    """database configured for a fake driver, with no client created yet"""
+    FakeClient.created = []
+    monkeypatch.setattr(database, "MongoClient", FakeClient)
+    monkeypatch.setattr(database, "AsyncIOMotorClient", FakeClient)
+    monkeypatch.setattr(database, "database_url", "mongodb://db.example:27017")
+    monkeypatch.setattr(database, "database_name", "app")
+    for name in ("_client", "_db", "_async_client", "_async_db"):
+        monkeypatch.setattr(database, name, None)
+    return FakeClient.created
+
+
+def test_client_options_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_MAX_POOL_SIZE", "200")
+    monkeypatch.setenv("DATABASE_MIN_POOL_SIZE", "10")
+    monkeypatch.setenv("DATABASE_MAX_IDLE_TIME_MS", "60000")
+    monkeypatch.setenv("DATABASE_SERVER_SELECTION_TIMEOUT_MS", "2000")
+    monkeypatch.setenv("DATABASE_COMPRESSORS", "zstd,snappy")
+    assert database.client_options() == {
+        "maxPoolSize": 200,
+        "minPoolSize": 10,
+        "maxIdleTimeMS": 60000,
+        "serverSelectionTimeoutMS": 2000,
+        "compressors": "zstd,snappy",
+    }
+
+
+def test_unset_or_empty_options_are_left_to_the_driver(monkeypatch):
+    for env, _ in database._POOL_OPTIONS.values():
+        monkeypatch.delenv(env, raising=False)
+    monkeypatch.setenv("DATABASE_MAX_POOL_SIZE", "")
+    assert database.client_options() == {}
+
+
+def test_clients_are_created_once_on_first_use(fake_clients, monkeypatch):
+    monkeypatch.setenv("DATABASE_MAX_POOL_SIZE", "50")
+    assert fake_clients == []
+
+    async_db = database.get_async_db()
+    assert database.get_async_db() is async_db
+    assert database.async_db is async_db
+    assert len(fake_clients) == 1
+    assert fake_clients[0].url == "mongodb://db.example:27017"
+    assert fake_clients[0].options["maxPoolSize"] == 50
+    assert async_db == (fake_clients[0], "app")
+
+    database.get_db()
+    assert len(fake_clients) == 2
+
+
+def test_close_clients_then_reconnect(fake_clients):
+    database.get_db()
+    database.get_async_db()
+    database.close_clients()
+    assert all(c.closed for c in fake_clients)
+
+    reopened = database.get_async_db()
+    assert len(fake_clients) == 3
+    assert reopened[0] is fake_clients[-1] and not reopened[0].closed
+
+
+def test_unconfigured_database_is_none(fake_clients, monkeypatch):
+    monkeypatch.setattr(database, "database_url", None)
+    assert database.get_async_db() is None
+    assert database.get_db() is None
+    assert fake_clients == []
+    with pytest.raises(Exception, match="Database not available"):
+        database._require_async_db()
+
+
+# -------------------------------
+# CRUD helpers, on mongomock
+# -------------------------------
+
+@pytest.fixture
+def sync_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(database, "_db", db)
+    return db
+
+
+NOW = datetime(2031, 1, 1, tzinfo=timezone.utc)
+
+
+def test_target_filter():
+    oid = ObjectId()
+    assert database._target_filter(oid) == {"_id": oid}
+    assert database._target_filter(str(oid)) == {"_id": oid}
+    # strings that are not ObjectIds are ids in their own right
+    assert database._target_filter("MR-1") == {"_id": "MR-1"}
+    assert database._target_filter({"code": "MR-1"}) == {"code": "MR-1"}
+
+
+def test_stamped_update_forms():
+    assert database._stamped({"name": "x"}, NOW) == {"$set": {"name": "x", "updated_at": NOW}}
+    update = {"$set": {"name": "x"}, "$inc": {"n": 1}}
+    assert database._stamped(update, NOW) == {"$set": {"name": "x", "updated_at": NOW}, "$inc": {"n": 1}}
+    assert update == {"$set": {"name": "x"}, "$inc": {"n": 1}}, "caller's update must not be modified"
+    assert database._stamped({"$unset": {"a": ""}}, NOW) == {"$unset": {"a": ""}, "$set": {"updated_at": NOW}}
+    pipeline = [{"$set": {"n": {"$add": ["$n", 1]}}}]
+    assert database._stamped(pipeline, NOW) == [*pipeline, {"$set": {"updated_at": NOW}}]
+
+
+def test_update_and_delete_by_id_forms(sync_db):
+    oid = sync_db["facility"].insert_one({"code": "MR-1", "n": 1}).inserted_id
+    sync_db["facility"].insert_one({"_id": "BH-1", "n": 1})
+
+    assert database.update_document("facility", str(oid), {"$inc": {"n": 1}}) == 1
+    assert database.update_document("facility", "BH-1", [{"$set": {"n": {"$add": ["$n", 5]}}}]) == 1
+    assert sync_db["facility"].find_one({"_id": oid})["n"] == 2
+    row = sync_db["facility"].find_one({"_id": "BH-1"})
+    assert row["n"] == 6 and "updated_at" in row
+
+    assert database.delete_document("facility", "BH-1") == 1
+    assert database.delete_document("facility", str(ObjectId())) == 0
+
+
+def test_upsert_document_keeps_created_at(sync_db):
+    new_id = database.upsert_document("facility", {"code": "MR-9"}, {"code": "MR-9", "name": "Room 9"})
+    first = sync_db["facility"].find_one({"code": "MR-9"})
+    assert new_id == str(first["_id"]) and first["created_at"] == first["updated_at"]
+
+    assert database.upsert_document("facility", {"code": "MR-9"}, {"name": "Room Nine"}) is None
+    second = sync_db["facility"].find_one({"code": "MR-9"})
+    assert second["name"] == "Room Nine" and second["_id"] == first["_id"]
+    assert second["created_at"] == first["created_at"] and second["updated_at"] >= first["updated_at"]
+
+
+def test_bulk_write_summary_and_errors(sync_db):
+    oid = sync_db["facility"].insert_one({"code": "MR-1"}).inserted_id
+    sync_db["facility"].insert_one({"_id": "BH-1", "code": "BH-1"})
+    summary = database.bulk_write("facility", [
+        database.update_op(str(oid), {"name": "Room 1"}),
+        database.update_op("BH-1", {"name": "Hall"}),
+        database.update_op({"code": "MR-2"}, {"name": "Room 2"}, upsert=True),
+        InsertOne({"_id": "BH-1"}),
+        DeleteOne({"_id": "missing"}),
+    ])
+    assert (summary["matched"], summary["modified"], summary["upserted"], summary["inserted"]) == (2, 2, 1, 0)
+    assert [e["index"] for e in summary["errors"]] == [3]
+    assert "duplicate key" in summary["errors"][0]["error"].lower()
+    assert database.bulk_write("facility", []) == {
+        "matched": 0, "modified": 0, "inserted": 0, "upserted": 0, "deleted": 0, "errors": [],
+    }
+
+
+@pytest.mark.anyio
+async def test_async_helpers_match(app_db):
+    await app_db["facility"].insert_one({"_id": "BH-1", "code": "BH-1"})
+    assert await database.update_document_async("facility", "BH-1", {"name": "Hall"}) == 1
+    assert await database.upsert_document_async("facility", {"code": "MR-9"}, {"name": "Room 9"}) is not None
+    summary = await database.bulk_write_async("facility", [
+        database.update_op("BH-1", {"$set": {"name": "Main hall"}}),
+        InsertOne({"_id": "BH-1"}),
+    ], ordered=True)
+    assert (summary["modified"], [e["index"] for e in summary["errors"]]) == (1, [1])
+    row = await database.find_one_and_update_async("facility", {"code": "MR-9"}, {"$inc": {"n": 1}}, projection={"n": 1})
+    assert set(row) == {"_id", "n"} and row["n"] == 1
+
+
+def test_insert_chunk_result_ordered_stops_at_first_error():
+    docs = [{"_id": i} for i in range(5)]
+    error = BulkWriteError({"nInserted": 2, "writeErrors": [{"index": 2, "errmsg": "E11000 duplicate key"}]})
+    ids, errors, stopped = database._insert_chunk_result(docs, 10, error)
+    assert ids == ["0", "1"] and stopped
+    assert errors == [{"index": 12, "error": "E11000 duplicate key"}]
+
+
+def test_insert_chunk_result_unordered_attempts_everything():
+    docs = [{"_id": i} for i in range(5)]
+    error = BulkWriteError({"nInserted": 3, "writeErrors": [{"index": 1, "errmsg": "dup"}, {"index": 3, "errmsg": "dup"}]})
+    ids, errors, stopped = database._insert_chunk_result(docs, 10, error)
+    assert ids == ["0", "2", "4"] and not stopped
+    assert [e["index"] for e in errors] == [11, 13]
+
+
+@pytest.mark.parametrize("ordered,inserted,failed", [
+    (True, ["a", "b", "c"], [3]),
+    (False, ["a", "b", "c", "e", "f", "g"], [3, 6]),
+])
+def test_create_documents_with_duplicate_ids(sync_db, ordered, inserted, failed):
+    # chunks of 3: [a b c] [a e f] [b g]
+    items = [{"_id": x} for x in ["a", "b", "c", "a", "e", "f", "b", "g"]]
+    result = database.create_documents("facility", items, ordered=ordered, chunk_size=3)
+    assert result["inserted_ids"] == inserted
+    assert [e["index"] for e in result["errors"]] == failed
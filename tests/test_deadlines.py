@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from deadlines import DeadlineQueue
+
+pytestmark = pytest.mark.anyio
+
+
+async def _noop(keys):
+    pass
+
+
+async def test_rescheduling_same_deadline_does_not_grow_heap():
+    q = DeadlineQueue(_noop)
+    deadline = datetime(2031, 1, 1, 9, 15)
+    for _ in range(288):
+        q.schedule("b1", deadline)
+    assert q.stats()["heap_size"] == 1
+
+
+async def test_none_deadline_cancels():
+    q = DeadlineQueue(_noop)
+    q.schedule("b1", datetime(2031, 1, 1))
+    q.schedule("b1", None)
+    q.schedule("b2", None)
+    assert len(q) == 0
+    q.schedule("b3", datetime(2031, 1, 2))
+    assert q.stats()["next_deadline"] is not None
+
+
+async def test_stale_entries_are_compacted():
+    q = DeadlineQueue(_noop)
+    base = datetime(2031, 1, 1)
+    for i in range(1000):
+        q.schedule("b1", base + timedelta(minutes=i))
+    assert len(q) == 1
+    assert q.stats()["heap_size"] <= 2 * len(q) + 65
+
+
+async def test_only_latest_deadline_fires():
+    q = DeadlineQueue(_noop)
+    now = datetime.utcnow()
+    q.schedule("a", now - timedelta(seconds=2))
+    q.schedule("a", now + timedelta(hours=1))
+    q.schedule("b", now - timedelta(seconds=1))
+    q.cancel("b")
+    assert q._pop_due(now) == []
+
+
+async def test_stop_right_after_schedule_does_not_hang():
+    q = DeadlineQueue(_noop)
+    for i in range(20):
+        q.start()
+        q.schedule("a", datetime.utcnow() + timedelta(hours=1))
+        await asyncio.sleep(0)
+        q.schedule(f"b{i}", datetime.utcnow() + timedelta(minutes=1))
+        await asyncio.wait_for(q.stop(), timeout=2)
@@ -0,0 +1,37 @@
+import pytest
+
+from digest import DIGEST_COLLECTION, AdminDigest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_flush_keeps_items_and_does_not_raise(mock_db):
+    fail = [True]
+    flushed = []
+
+    async def on_flush(items):
+        if fail[0]:
+            raise OSError("smtp down")
+        flushed.extend(items)
+
+    digest = AdminDigest(on_flush, max_items=2)
+    await digest.add(mock_db, {"facility_code": "MR-1"})
+    await digest.add(mock_db, {"facility_code": "MR-2"})
+    assert await mock_db[DIGEST_COLLECTION].count_documents({"flush_id": None}) == 2
+
+    fail[0] = False
+    assert await digest.flush(mock_db) == 2
+    assert [i["facility_code"] for i in flushed] == ["MR-1", "MR-2"]
+    assert await mock_db[DIGEST_COLLECTION].count_documents({}) == 0
+
+
+async def test_flush_when_full(mock_db):
+    batches = []
+
+    async def on_flush(items):
+        batches.append(len(items))
+
+    digest = AdminDigest(on_flush, max_items=3)
+    for i in range(7):
+        await digest.add(mock_db, {"n": i})
+    assert batches == [3, 3]
@@ -0,0 +1,62 @@
+"""Streaming exports: correct rows, and flat server memory however many match"""
+
+import csv
+import io
+import json
+import os
+import tracemalloc
+
+import pytest
+
+import database
+import main
+from bench_mongo import seed
+
+pytestmark = pytest.mark.anyio
+
+EXPORT_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "1000000"))
+
+
+async def consume(fmt, **filters):
+    """Drain the endpoint's body iterator server-side; returns (rows, peak traced bytes)"""
+    params = {"status": None, "date_from": None, "date_to": None, **filters}
+    response = await main.export_bookings(fmt=fmt, **params)
+    rows = -1 if fmt == "csv" else 0  # header
+    tracemalloc.start()
+    try:
+        async for chunk in response.body_iterator:
+            rows += chunk.count("\n")
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return rows, peak
+
+
+async def test_csv_and_ndjson_rows(app_db):
+    await seed(app_db, 2500)
+    response = await main.export_bookings(fmt="csv", status="approved", date_from="2030-01-01", date_to="2030-06-30")
+    body = "".join([chunk async for chunk in response.body_iterator])
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert rows and all(r["status"] == "approved" and r["date"] <= "2030-06-30" for r in rows)
+    assert rows[0]["purpose"] == "Synthetic row, with a comma"
+    assert [(r["date"], r["start_time"]) for r in rows] == sorted((r["date"], r["start_time"]) for r in rows)
+
+    response = await main.export_bookings(fmt="ndjson", status=None, date_from=None, date_to=None)
+    lines = "".join([chunk async for chunk in response.body_iterator]).splitlines()
+    assert len(lines) == 2500
+    assert set(json.loads(lines[0])) == set(main.EXPORT_FIELDS)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+async def test_export_memory_is_flat(mongo_db, monkeypatch, fmt):
+    """EXPORT_TEST_ROWS (default 1M) rows on a real MongoDB; peak memory must not track row count"""
+    monkeypatch.setattr(database, "_async_db", mongo_db)
+    small = max(EXPORT_ROWS // 10, main.EXPORT_BATCH_SIZE * 5)
+    await seed(mongo_db, small)
+    rows_small, peak_small = await consume(fmt)
+    await seed(mongo_db, EXPORT_ROWS - small)
+    rows_large, peak_large = await consume(fmt)
+
+    assert rows_small == small and rows_large == EXPORT_ROWS
+    assert peak_large < 2 * peak_small + 4_000_000, \
+        f"peak {peak_small / 1e6:.1f} MB for {small} rows but {peak_large / 1e6:.1f} MB for {EXPORT_ROWS} rows"
@@ -0,0 +1,97 @@
+"""Every booking query shape main.py issues must be served by an index"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from indexes import ensure_indexes
+from main import ADMIN_BOOKINGS_SORT, admin_booking_filter
+from database import keyset_filter
+
+pytestmark = pytest.mark.anyio
+
+LIVE = {"$in": ["pending", "approved"]}
+MINE_SORT = [("date", 1), ("start_time", 1), ("_id", 1)]
+
+# (name, find filter, sort) or (name, aggregation pipeline, None)
+QUERY_SHAPES = [
+    ("availability", {"facility_code": "MR-1", "date": "2030-01-02", "status": LIVE}, None),
+    ("availability_grid", [{"$match": {"facility_code": {"$in": ["MR-1", "MR-2"]}, "date": "2030-01-02", "status": LIVE}}], None),
+    ("availability_range", {"facility_code": {"$in": ["MR-1", "MR-2"]}, "date": {"$gte": "2030-01-01", "$lte": "2030-01-07"}, "status": LIVE},
+     [("facility_code", 1), ("date", 1)]),
+    ("my_bookings_by_id", {"user_id": "u1", "date": {"$gte": "2030-01-01"}}, MINE_SORT),
+    ("my_bookings_by_email", {"user_email": "u1@example.com"}, [(k, -1) for k, _ in MINE_SORT]),
+    ("my_bookings_next_page", {"$and": [{"user_id": "u1"}, keyset_filter(MINE_SORT, ["2030-01-02", "09:00", None])]}, MINE_SORT),
+    ("admin_bookings", admin_booking_filter(None, None, None, None), ADMIN_BOOKINGS_SORT),
+    ("admin_bookings_status", admin_booking_filter("pending", None, "2030-01-01", "2030-01-31"), ADMIN_BOOKINGS_SORT),
+    ("admin_bookings_facility", admin_booking_filter(None, "MR-1", "2030-01-01", None), ADMIN_BOOKINGS_SORT),
+    ("sweep_noshows", {"status": "approved", "no_show_deadline": {"$lte": datetime(2030, 1, 2)}, "checked_in_at": None}, None),
+    ("load_noshow_deadlines", {"status": "approved", "no_show_deadline": {"$ne": None, "$lte": datetime(2030, 1, 2)}, "checked_in_at": None}, None),
+]
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def _winning_plans(explain):
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+async def _seed(db, n=2000):
+    rng = random.Random(7)
+    start = datetime(2030, 1, 1, 8)
+    await db["booking"].insert_many([
+        {
+            "facility_code": f"MR-{rng.randint(1, 10)}",
+            "date": (start + timedelta(days=rng.randint(0, 60))).date().isoformat(),
+            "start_time": f"{rng.randint(8, 20):02d}:00",
+            "status": rng.choice(["pending", "approved", "rejected", "no_show"]),
+            "user_id": f"u{rng.randint(1, 200)}",
+            "user_email": f"u{rng.randint(1, 200)}@example.com",
+            "checked_in_at": None,
+            "no_show_deadline": start + timedelta(hours=rng.randint(0, 1000)),
+        }
+        for _ in range(n)
+    ])
+
+
+@pytest.mark.parametrize("name,query,sort", QUERY_SHAPES, ids=[q[0] for q in QUERY_SHAPES])
+async def test_no_collscan(mongo_db, name, query, sort):
+    report = await ensure_indexes(mongo_db)
+    assert not report["conflicts"]
+    await _seed(mongo_db)
+
+    if isinstance(query, list):
+        command = {"aggregate": "booking", "pipeline": query, "cursor": {}}
+    else:
+        command = {"find": "booking", "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+    explain = await mongo_db.command({"explain": command, "verbosity": "queryPlanner"})
+
+    plans = list(_winning_plans(explain))
+    assert plans, f"{name}: no winning plan in explain output"
+    for plan in plans:
+        assert "COLLSCAN" not in set(_stages(plan)), f"{name} uses a collection scan: {plan}"
+
+
+async def test_ensure_indexes_is_idempotent(mongo_db):
+    first = await ensure_indexes(mongo_db)
+    second = await ensure_indexes(mongo_db)
+    assert first["created"] and not second["created"]
+    assert not second["conflicts"] and not second["extra"]
@@ -0,0 +1,130 @@
+"""SMTPPool: session reuse, NOOP health checks, idle expiry, reconnect"""
+
+import smtplib
+import types
+
+import pytest
+
+import mailer
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent, self.noops, self.closed, self.reset = [], 0, False, False
+        self.noop_code = 250
+        self.fail_next = None
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        self.noops += 1
+        return (self.noop_code, b"OK")
+
+    def sendmail(self, from_addr, to_addrs, message):
+        if self.fail_next is not None:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        self.sent.append(message)
+
+    def rset(self):
+        self.reset = True
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    FakeSMTP.instances = []
+    monkeypatch.setattr(mailer.smtplib, "SMTP", FakeSMTP)
+    monkeypatch.setattr(mailer, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def pool():
+    return mailer.SMTPPool("smtp.example.com", 587, "user", "secret", max_size=2, idle_timeout=60, noop_after=10)
+
+
+def send(p, body="hello"):
+    p.send("noreply@example.com", ["u1@example.com"], body)
+
+
+def test_sessions_are_reused(clock):
+    p = pool()
+    send(p)
+    clock[0] += 1
+    send(p)
+    assert len(FakeSMTP.instances) == 1 and FakeSMTP.instances[0].noops == 0
+    assert p.stats() == {"idle": 1, "max_size": 2, "opened": 1, "reused": 1}
+
+
+def test_noop_checks_a_quiet_session(clock):
+    p = pool()
+    send(p)
+    clock[0] += 30
+    send(p)
+    server = FakeSMTP.instances[0]
+    assert server.noops == 1 and server.sent == ["hello", "hello"]
+    assert len(FakeSMTP.instances) == 1
+
+
+def test_failed_noop_replaces_the_session(clock):
+    p = pool()
+    send(p)
+    FakeSMTP.instances[0].noop_code = 421
+    clock[0] += 30
+    send(p, "second")
+    stale, fresh = FakeSMTP.instances
+    assert stale.closed and stale.sent == ["hello"]
+    assert fresh.sent == ["second"]
+
+
+def test_sessions_idle_past_the_timeout_are_closed(clock):
+    p = pool()
+    send(p)
+    clock[0] += 61
+    send(p, "second")
+    expired, fresh = FakeSMTP.instances
+    assert expired.closed and expired.noops == 0
+    assert fresh.sent == ["second"] and p.stats()["opened"] == 2
+
+
+def test_dropped_session_is_retried_once_on_a_new_connection(clock):
+    p = pool()
+    send(p)
+    FakeSMTP.instances[0].fail_next = smtplib.SMTPServerDisconnected("gone")
+    send(p, "second")
+    dropped, fresh = FakeSMTP.instances
+    assert dropped.closed and dropped.sent == ["hello"]
+    assert fresh.sent == ["second"]
+    assert p.stats()["idle"] == 1
+
+
+def test_rejected_message_keeps_the_session(clock):
+    p = pool()
+    send(p)
+    FakeSMTP.instances[0].fail_next = smtplib.SMTPRecipientsRefused({"u1@example.com": (550, b"no such user")})
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        send(p, "second")
+    server = FakeSMTP.instances[0]
+    assert server.reset and not server.closed
+    send(p, "third")
+    assert len(FakeSMTP.instances) == 1 and server.sent == ["hello", "third"]
+
+
+def test_close_quits_idle_sessions(clock):
+    p = pool()
+    send(p)
+    p.close()
+    assert FakeSMTP.instances[0].closed and p.stats()["idle"] == 0
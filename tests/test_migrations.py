@@ -0,0 +1,28 @@
+"""One-off backfills run once, then stay out of the startup path"""
+
+import pytest
+
+from migrations import MIGRATION_COLLECTION, backfill_booking_minutes
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_booking_minutes_backfill_runs_once(mock_db, capsys):
+    await mock_db["booking"].insert_many([
+        {"date": "2031-03-03", "start_time": "09:00", "end_time": "10:30"},
+        {"date": "03/03/2031", "start_time": "09:00", "end_time": "10:30"},
+    ])
+    assert await backfill_booking_minutes(mock_db) == 1
+    row = await mock_db["booking"].find_one({"date": "2031-03-03"})
+    assert (row["start_min"], row["end_min"]) == (540, 630)
+    marker = await mock_db[MIGRATION_COLLECTION].find_one({"_id": "booking_minutes"})
+    assert (marker["updated"], marker["skipped"]) == (1, 1)
+    assert capsys.readouterr().out.count("[MIGRATION ERROR]") == 1
+
+    # the unparseable row is not scanned or logged again on the next startup
+    await mock_db["booking"].insert_one({"date": "2031-03-04", "start_time": "09:00", "end_time": "10:00"})
+    assert await backfill_booking_minutes(mock_db) == 0
+    assert "[MIGRATION ERROR]" not in capsys.readouterr().out
+
+    # the command line forces a rerun
+    assert await backfill_booking_minutes(mock_db, force=True) == 1
@@ -0,0 +1,69 @@
+"""Booking lists: upcoming/past split, keyset pages, cursor and field validation"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import main
+
+pytestmark = pytest.mark.anyio
+
+
+# a day ahead of and behind UTC: at any hour one of them has a different date than UTC
+@pytest.mark.parametrize("tz", ["Etc/GMT-14", "Etc/GMT+12"])
+async def test_upcoming_and_past_use_the_facility_date(client, app_db, monkeypatch, tz):
+    monkeypatch.setattr(main, "FACILITY_TZ", ZoneInfo(tz))
+    today = datetime.now(ZoneInfo(tz)).date()
+    await app_db["booking"].insert_many([
+        {"user_id": "u1", "facility_code": "MR-1", "date": d.isoformat(), "start_time": "09:00", "end_time": "10:00", "status": "approved"}
+        for d in (today - timedelta(days=1), today)
+    ])
+
+    upcoming = (await client.get("/api/bookings/mine", params={"user_id": "u1", "when": "upcoming"})).json()["items"]
+    past = (await client.get("/api/bookings/mine", params={"user_id": "u1", "when": "past"})).json()["items"]
+    assert [b["date"] for b in upcoming] == [today.isoformat()]
+    assert [b["date"] for b in past] == [(today - timedelta(days=1)).isoformat()]
+
+
+async def test_pages_cover_every_booking_once(client, app_db):
+    await app_db["booking"].insert_many([
+        {"user_id": "u1", "facility_code": "MR-1", "date": f"2031-03-{d:02d}", "start_time": f"{h:02d}:00", "end_time": f"{h + 1:02d}:00", "status": "approved"}
+        for d in range(1, 6) for h in (9, 11)
+    ])
+    seen, params = [], {"user_id": "u1", "limit": 3}
+    while True:
+        page = (await client.get("/api/bookings/mine", params=params)).json()
+        seen += [(b["date"], b["start_time"]) for b in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert seen == sorted(seen) and len(seen) == len(set(seen)) == 10
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("bad", [
+    "not base64!",
+    cursor(["2031-03-01", "5f0000000000000000000000"]),
+    cursor(["2031-03-01", "09:00", "10:00", "5f0000000000000000000000"]),
+    cursor([{"$gt": ""}, "09:00", "5f0000000000000000000000"]),
+    cursor(["2031-03-01", "09:00", "not-an-id"]),
+    cursor({"date": "2031-03-01"}),
+])
+async def test_malformed_cursors_are_rejected(client, bad):
+    r = await client.get("/api/bookings/mine", params={"user_id": "u1", "cursor": bad})
+    assert r.status_code == 400
+    r = await client.get("/api/admin/bookings", params={"cursor": bad})
+    assert r.status_code == 400
+
+
+async def test_operator_field_names_are_rejected(client):
+    r = await client.get("/api/admin/bookings", params={"fields": "date,$where"})
+    assert r.status_code == 400
+    r = await client.get("/api/admin/bookings", params={"fields": "date,purpose"})
+    assert r.status_code == 200
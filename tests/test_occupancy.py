@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from bench_occupancy import CLOSE_MIN, OPEN_MIN, minute_loop, random_day
+from bench_slots import minute_scan, synthetic_intervals
+from occupancy import day_occupancy, earliest_slots, free_gaps, merge_intervals, to_hhmm, to_minutes
+
+
+def test_matches_minute_loop():
+    rng = random.Random(1)
+    for _ in range(20000):
+        day = random_day(rng.randint(0, 30), rng)
+        assert day_occupancy(day, OPEN_MIN, CLOSE_MIN)["fully_occupied"] == minute_loop(day, OPEN_MIN, CLOSE_MIN), day
+
+
+def test_busy_and_free_cover_the_day_exactly():
+    rng = random.Random(2)
+    for _ in range(2000):
+        occ = day_occupancy(random_day(rng.randint(0, 30), rng), OPEN_MIN, CLOSE_MIN)
+        blocks = sorted(
+            [(max(s, OPEN_MIN), min(e, CLOSE_MIN)) for s, e in occ["busy"] if min(e, CLOSE_MIN) > max(s, OPEN_MIN)]
+            + occ["free"]
+        )
+        assert blocks[0][0] == OPEN_MIN and blocks[-1][1] == CLOSE_MIN
+        assert all(a[1] == b[0] for a, b in zip(blocks, blocks[1:]))
+
+
+def test_touching_intervals_merge():
+    assert merge_intervals([(600, 660), (540, 600), (700, 700)]) == [(540, 660)]
+
+
+def test_full_day():
+    occ = day_occupancy([(OPEN_MIN, 720), (720, CLOSE_MIN)], OPEN_MIN, CLOSE_MIN)
+    assert occ["fully_occupied"] and occ["free"] == []
+
+
+def test_bookings_outside_hours_are_clipped():
+    occ = day_occupancy([(6 * 60, 9 * 60), (21 * 60, 23 * 60)], OPEN_MIN, CLOSE_MIN)
+    assert occ["busy"] == [(OPEN_MIN, 9 * 60), (21 * 60, CLOSE_MIN)]
+    assert free_gaps(occ["busy"], OPEN_MIN, CLOSE_MIN) == [(9 * 60, 21 * 60)]
+
+
+def test_earliest_slots_match_minute_scan():
+    rng = random.Random(3)
+    intervals = synthetic_intervals(20000, rng)
+    codes = ["F-1", "F-2", "F-3"]
+    days = sorted({d for _, d in intervals})[:14]
+    for duration, lo, hi, limit in ((30, OPEN_MIN, CLOSE_MIN, 100), (120, 9 * 60, 18 * 60, 10), (600, OPEN_MIN, CLOSE_MIN, 5)):
+        args = (intervals, codes, days, duration, lo, hi, limit)
+        assert earliest_slots(*args) == minute_scan(*args)
+
+
+def test_earliest_slots_skip_the_past():
+    intervals = {("F-1", "2031-01-02"): [(9 * 60, 10 * 60)]}
+    days = ["2031-01-01", "2031-01-02", "2031-01-03"]
+    slots = earliest_slots(intervals, ["F-1"], days, 60, OPEN_MIN, CLOSE_MIN, 3, not_before=("2031-01-02", 8 * 60 + 30))
+    assert slots == [("2031-01-02", 10 * 60, "F-1"), ("2031-01-03", OPEN_MIN, "F-1")]
+
+
+@pytest.mark.parametrize("hhmm", ["00:00", "08:05", "23:59"])
+def test_minutes_round_trip(hhmm):
+    assert to_hhmm(to_minutes(hhmm)) == hhmm
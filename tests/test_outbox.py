@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from outbox import OUTBOX_COLLECTION, OutboxWorker
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_claims_at_most_concurrency_messages(mock_db):
+    outstanding, peak = [0], [0]
+    lock = threading.Lock()
+
+    def send(to, subject, body):
+        with lock:
+            outstanding[0] += 1
+            peak[0] = max(peak[0], outstanding[0])
+        time.sleep(0.01)
+        with lock:
+            outstanding[0] -= 1
+
+    worker = OutboxWorker(send, concurrency=3, batch_size=20)
+    worker.db = mock_db
+    await worker.enqueue_many(mock_db, [{"to": f"u{i}@x", "subject": "s", "body": "b"} for i in range(12)])
+
+    claimed = []
+    claim = worker._claim
+
+    async def tracking_claim():
+        msg = await claim()
+        if msg is not None:
+            claimed.append(msg["_id"])
+            sending = await mock_db[OUTBOX_COLLECTION].count_documents({"status": "sending"})
+            assert sending <= 3
+        return msg
+
+    worker._claim = tracking_claim
+    assert await worker.drain_once() == 12
+    assert peak[0] <= 3
+    assert await mock_db[OUTBOX_COLLECTION].count_documents({"status": "sent"}) == 12
+
+
+async def test_expired_claim_is_not_overwritten(mock_db):
+    def send(to, subject, body):
+        pass
+
+    worker = OutboxWorker(send, claim_seconds=60)
+    worker.db = mock_db
+    await worker.enqueue(mock_db, "u@x", "s", "b")
+    msg = await worker._claim()
+    # another worker re-claimed it after our claim expired
+    await mock_db[OUTBOX_COLLECTION].update_one(
+        {"_id": msg["_id"]}, {"$set": {"next_attempt_at": datetime.utcnow() + timedelta(seconds=120)}}
+    )
+    await worker._deliver(msg)
+    row = await mock_db[OUTBOX_COLLECTION].find_one({"_id": msg["_id"]})
+    assert row["status"] == "sending"
+    assert worker.claims_lost == 1
+
+
+async def test_failures_back_off_then_park(mock_db):
+    def send(to, subject, body):
+        raise OSError("down")
+
+    worker = OutboxWorker(send, max_attempts=2, backoff_base_seconds=0)
+    worker.db = mock_db
+    await worker.enqueue(mock_db, "u@x", "s", "b")
+    # zero backoff makes the retry due again within the same drain
+    assert await worker.drain_once() == 2
+    row = await mock_db[OUTBOX_COLLECTION].find_one({})
+    assert row["status"] == "failed" and row["attempts"] == 2
+    assert worker.retried == 1 and worker.failed == 1
+
+
+async def test_stop_right_after_enqueue_does_not_hang(mock_db):
+    worker = OutboxWorker(lambda to, subject, body: None)
+    for _ in range(20):
+        worker.start(mock_db)
+        await asyncio.sleep(0)
+        await worker.enqueue(mock_db, "u@x", "s", "b")
+        await asyncio.wait_for(worker.stop(), timeout=2)
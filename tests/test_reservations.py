@@ -0,0 +1,163 @@
+"""Slot reservations: the database, not Python, decides who gets a slot"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import main
+from catalog import catalog
+from reservations import RESERVATION_COLLECTION
+
+pytestmark = pytest.mark.anyio
+
+BOOKING = {
+    "facility_code": "MR-1",
+    "user_id": "u1",
+    "user_name": "Test User",
+    "user_email": "u1@example.com",
+}
+
+
+def booking(date_str, start, end, **extra):
+    return {**BOOKING, "date": date_str, "start_time": start, "end_time": end, **extra}
+
+
+@pytest.fixture
+def interleaved(monkeypatch):
+    """Make every mongomock-motor operation yield to the event loop first
+
+    mongomock runs each call to completion without awaiting anything, so
+    concurrent requests never interleave between a read and a write the way
+    they do against a real server.
+    """
+    import mongomock_motor
+
+    def yielding(method):
+        async def wrapper(*args, **kwargs):
+            await asyncio.sleep(0)
+            return await method(*args, **kwargs)
+        return wrapper
+
+    for cls in (mongomock_motor.AsyncMongoMockCollection, mongomock_motor.AsyncCursor):
+        for name in dir(cls):
+            method = getattr(cls, name)
+            if not name.startswith("_") and asyncio.iscoroutinefunction(method):
+                monkeypatch.setattr(cls, name, yielding(method))
+    # requests now contend for the catalog reload lock, which binds it to
+    # this test's event loop; give the test a lock of its own
+    monkeypatch.setattr(catalog, "_lock", asyncio.Lock())
+
+
+def overlapping_payloads(date_str, n=200):
+    rng = random.Random(3)
+    # every interval contains 10:00-10:30, so any two overlap
+    return [
+        booking(date_str, f"{rng.choice(['09', '10'])}:00", f"{rng.choice(['10:30', '11:00', '11:30'])}")
+        for _ in range(n)
+    ]
+
+
+async def test_interleaving_exposes_check_then_write(client, interleaved, monkeypatch):
+    """Sanity check for the fixture: a read-then-push reservation double-books under it"""
+    async def racy_reserve(db, facility_code, date_str, booking_id, start, end):
+        day = await db[RESERVATION_COLLECTION].find_one({"facility_code": facility_code, "date": date_str}) or {}
+        if any(i["start"] < end and i["end"] > start for i in day.get("intervals", [])):
+            return False
+        await db[RESERVATION_COLLECTION].update_one(
+            {"facility_code": facility_code, "date": date_str},
+            {"$push": {"intervals": {"booking_id": booking_id, "start": start, "end": end}}},
+            upsert=True,
+        )
+        return True
+
+    monkeypatch.setattr(main, "reserve", racy_reserve)
+    responses = await asyncio.gather(*(client.post("/api/bookings", json=p) for p in overlapping_payloads("2031-03-02", 20)))
+    assert [r.status_code for r in responses].count(200) > 1
+
+
+async def test_concurrent_overlapping_requests_book_once(client, interleaved):
+    responses = await asyncio.gather(*(client.post("/api/bookings", json=p) for p in overlapping_payloads("2031-03-03")))
+
+    codes = [r.status_code for r in responses]
+    assert codes.count(200) == 1
+    assert codes.count(409) == 199
+
+    day = (await client.get("/api/availability", params={"facility_code": "MR-1", "date": "2031-03-03"})).json()
+    assert len(day["unavailable"]) == 1
+
+
+async def test_concurrent_disjoint_requests_all_book(client, interleaved):
+    payloads = [booking("2031-03-04", f"{h:02d}:00", f"{h + 1:02d}:00") for h in range(8, 22)]
+    responses = await asyncio.gather(*(client.post("/api/bookings", json=p) for p in payloads))
+    assert [r.status_code for r in responses] == [200] * len(payloads)
+
+
+async def test_reject_frees_slot(client):
+    first = (await client.post("/api/bookings", json=booking("2031-03-05", "09:00", "10:00"))).json()["booking_id"]
+    await client.post(f"/api/bookings/{first}/admin", json={"action": "reject"})
+    r = await client.post("/api/bookings", json=booking("2031-03-05", "09:00", "10:00"))
+    assert r.status_code == 200
+
+
+async def test_reapprove_reclaims_slot(client):
+    b = (await client.post("/api/bookings", json=booking("2031-03-06", "09:00", "10:00"))).json()["booking_id"]
+    await client.post(f"/api/bookings/{b}/admin", json={"action": "reject"})
+    r = await client.post(f"/api/bookings/{b}/admin", json={"action": "approve"})
+    assert r.status_code == 200
+
+    r = await client.post("/api/bookings", json=booking("2031-03-06", "09:00", "10:00"))
+    assert r.status_code == 409
+
+
+async def test_reapprove_conflicts_with_newer_booking(client):
+    b = (await client.post("/api/bookings", json=booking("2031-03-07", "09:00", "10:00"))).json()["booking_id"]
+    await client.post(f"/api/bookings/{b}/admin", json={"action": "reject"})
+    assert (await client.post("/api/bookings", json=booking("2031-03-07", "09:30", "10:30"))).status_code == 200
+
+    r = await client.post(f"/api/bookings/{b}/admin", json={"action": "approve"})
+    assert r.status_code == 409
+    day = (await client.get("/api/availability", params={"facility_code": "MR-1", "date": "2031-03-07"})).json()
+    assert len(day["unavailable"]) == 1
+
+
+@pytest.mark.parametrize("date_str,start,end", [
+    ("01/01/2031", "09:00", "10:00"),
+    ("2031-02-30", "09:00", "10:00"),
+    ("2031-W01-1", "09:00", "10:00"),
+    ("20310303", "09:00", "10:00"),
+    ("2031-03-08", "09:00:00", "10:00"),
+    ("2031-03-08", "9:00", "10:00"),
+    ("2031-03-08", "09:00", "24:30"),
+    ("2031-03-08", "10:00", "09:00"),
+])
+async def test_malformed_booking_times_are_rejected(client, date_str, start, end):
+    r = await client.post("/api/bookings", json=booking(date_str, start, end))
+    assert r.status_code == 400
+
+
+async def test_slot_search_rejects_malformed_times(client):
+    params = {"type": "meeting_room", "duration": 60, "from": "2031-03-09", "to": "2031-03-09"}
+    assert (await client.get("/api/slots/search", params={**params, "earliest": "9am"})).status_code == 400
+    assert (await client.get("/api/slots/search", params={**params, "latest": "21:00"})).status_code == 200
+
+
+# a day ahead of and behind UTC: at any hour one of them has a different date than UTC
+@pytest.mark.parametrize("tz", ["Etc/GMT-14", "Etc/GMT+12"])
+async def test_slot_search_starts_at_the_facility_time(client, monkeypatch, tz):
+    monkeypatch.setattr(main, "FACILITY_TZ", ZoneInfo(tz))
+    now = datetime.now(ZoneInfo(tz))
+    today, now_hhmm = now.date(), now.strftime("%H:%M")
+    params = {
+        "type": "meeting_room", "duration": 15, "limit": 100,
+        "from": (today - timedelta(days=1)).isoformat(), "to": (today + timedelta(days=1)).isoformat(),
+    }
+    slots = (await client.get("/api/slots/search", params=params)).json()["slots"]
+
+    assert slots and all(s["date"] >= today.isoformat() for s in slots)
+    todays = [s for s in slots if s["date"] == today.isoformat()]
+    assert all(s["start"] >= now_hhmm for s in todays)
+    if "08:00" <= now_hhmm < "21:30":
+        assert todays
@@ -0,0 +1,72 @@
+"""Scheduler leases: one holder per job, takeover after expiry, hand-over on stop"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduler import LEASE_COLLECTION, Lease, Scheduler
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_second_owner_is_refused_while_held(mock_db):
+    a = Lease(mock_db, "job:sweep", "worker-a", ttl_seconds=60)
+    b = Lease(mock_db, "job:sweep", "worker-b", ttl_seconds=60)
+    assert await a.acquire()
+    assert not await b.acquire()
+    # the holder renews
+    assert await a.acquire()
+    assert (await mock_db[LEASE_COLLECTION].find_one({"_id": "job:sweep"}))["owner"] == "worker-a"
+
+
+async def test_takeover_after_expiry(mock_db):
+    a = Lease(mock_db, "job:sweep", "worker-a", ttl_seconds=60)
+    b = Lease(mock_db, "job:sweep", "worker-b", ttl_seconds=60)
+    assert await a.acquire()
+    await mock_db[LEASE_COLLECTION].update_one({"_id": "job:sweep"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+    assert await b.acquire()
+    assert not await a.acquire()
+    lease = await mock_db[LEASE_COLLECTION].find_one({"_id": "job:sweep"})
+    assert lease["owner"] == "worker-b" and lease["expires_at"] > datetime.utcnow()
+
+
+async def test_release_only_drops_own_lease(mock_db):
+    a = Lease(mock_db, "job:sweep", "worker-a", ttl_seconds=60)
+    b = Lease(mock_db, "job:sweep", "worker-b", ttl_seconds=60)
+    assert await a.acquire()
+    await b.release()
+    assert not await b.acquire()
+    await a.release()
+    assert await b.acquire()
+
+
+async def test_one_worker_runs_the_job_and_hands_over_on_stop(mock_db):
+    runs = {"a": 0, "b": 0}
+
+    def scheduler(name):
+        s = Scheduler()
+        s.owner = name
+
+        async def job():
+            runs[name] += 1
+
+        s.add_job("sweep", 0.01, job)
+        return s
+
+    a, b = scheduler("a"), scheduler("b")
+    await a.start(mock_db)
+    await asyncio.sleep(0.05)
+    await b.start(mock_db)
+    await asyncio.sleep(0.1)
+    assert runs["a"] > 0 and runs["b"] == 0
+    assert b.jobs[0].skipped > 0
+
+    await a.stop()
+    assert await mock_db[LEASE_COLLECTION].count_documents({"owner": "a"}) == 0
+    before = runs["b"]
+    await asyncio.sleep(0.1)
+    await b.stop()
+    assert runs["b"] > before
+    assert await mock_db[LEASE_COLLECTION].count_documents({}) == 0
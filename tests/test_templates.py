@@ -0,0 +1,47 @@
+"""Notification templates: user input is escaped, Safe fragments are not"""
+
+from templates import (
+    ACCESS_CODE, ADMIN_NEW_BOOKING, DIGEST_LINE, DIGEST_SECTION, USER_STATUS,
+    Safe, booking_values, facility_fragment, facility_label, user_status_values,
+)
+
+HOSTILE = {
+    "facility_code": "MR-1",
+    "date": "2031-03-03",
+    "start_time": "09:00",
+    "end_time": "10:00",
+    "user_id": "u1",
+    "user_name": "<script>alert(1)</script>",
+    "purpose": 'Team "sync" & <b>planning</b>',
+}
+
+
+def test_admin_new_booking_escapes_user_input():
+    body = ADMIN_NEW_BOOKING.render(**booking_values(HOSTILE))
+    assert "<script>" not in body
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in body
+    assert "Team &quot;sync&quot; &amp; &lt;b&gt;planning&lt;/b&gt;" in body
+    assert "<b>Facility:</b> MR-1" in body
+
+
+def test_digest_line_escapes_user_input():
+    line = DIGEST_LINE.render(**booking_values(HOSTILE))
+    assert "<script>" not in line and "&lt;script&gt;" in line
+    section = DIGEST_SECTION.render(facility=facility_label("MR-1"), date="2031-03-03", lines=Safe(line))
+    # the rendered line is a Safe fragment and must not be escaped twice
+    assert line in section and "&amp;lt;" not in section
+
+
+def test_safe_fragments_pass_through():
+    body = USER_STATUS.render(**user_status_values("approved", "MR-1", "2031-03-03", "09:00", "10:00", "A<1>"))
+    assert "<b>MR-1</b>" in body
+    assert "<p><b>Access code:</b> A&lt;1&gt;</p>" in body
+    assert ACCESS_CODE.render(code=Safe("<i>x</i>")) == "<p><b>Access code:</b> <i>x</i></p>"
+
+
+def test_facility_fragments_are_escaped_once_and_cached():
+    assert facility_label("<MR>") == "&lt;MR&gt;"
+    assert facility_fragment("<MR>") == "<b>&lt;MR&gt;</b>"
+    hits = facility_label.cache_info().hits
+    booking_values({**HOSTILE, "facility_code": "<MR>"})
+    assert facility_label.cache_info().hits == hits + 1